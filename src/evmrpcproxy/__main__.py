@@ -1,9 +1,8 @@
-import asyncio
-
 import typer
+import uvloop
 
 from .runlib import init_all
-from .settings import Settings
+from .settings import get_settings
 
 
 def api_main_cli() -> None:
@@ -13,7 +12,7 @@ def api_main_cli() -> None:
     """
     from .api_app import main_run
 
-    settings = Settings()
+    settings = get_settings()
     init_all(settings)
     main_run(settings)
 
@@ -21,10 +20,10 @@ def api_main_cli() -> None:
 def tasks_main_cli(*, once: bool = False) -> None:
     from .tasks import Tasks
 
-    settings = Settings()
+    settings = get_settings()
     init_all(settings)
-    worker = Tasks()
-    asyncio.run(worker.run(once=once))
+    worker = Tasks(settings=settings)
+    uvloop.run(worker.run(once=once))
 
 
 CLI_APP = typer.Typer()
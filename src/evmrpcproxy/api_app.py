@@ -1,21 +1,25 @@
 from __future__ import annotations
 
 import contextlib
-import functools
 import logging
-from typing import TYPE_CHECKING
+import os
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, ClassVar, NoReturn
 
 import fastapi
 import uvicorn
+from fastapi import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from hyapp.api import TraceIdMiddleware
 from hyapp.https import HTTPClient
+from uvicorn_worker import UvicornWorker  # type: ignore[import-untyped]
 
-from .api_common import AppState
-from .api_handlers import API_ROUTER
+from .api_common import AppState, TimingMiddleware
+from .api_handlers import API_ROUTER, handle_http_error
 from .common import make_evmrpc_cli
 from .runlib import init_all
-from .settings import Settings
+from .settings import Settings, get_settings
 from .stats import (
     REQUEST_STATS_COLUMNS,
     CHClient,
@@ -35,8 +39,8 @@ async def _setup_ch_stats(app_state: AppState, settings: Settings, acm: contextl
     if not ch_url:
         return app_state
 
-    http_cli = HTTPClient()
-    await acm.enter_async_context(http_cli)
+    # Share the connection pool with the EVMRPC client, but keep the HTTP client options (e.g. retries) separate.
+    http_cli = HTTPClient(session=app_state.evmrpccli.http_cli.session)
 
     ch_cli_reqs = CHClient(
         ch_table_name=settings.opts.ch_request_stats_table_name,
@@ -45,17 +49,24 @@ async def _setup_ch_stats(app_state: AppState, settings: Settings, acm: contextl
         http_cli=http_cli,
     )
     stats_reqs = StatsUpdater[RequestStatsKey](ch_cli=ch_cli_reqs)
+    await acm.enter_async_context(stats_reqs.manage_ctx())
 
     return app_state.replace(erp_request_stats=stats_reqs)
 
 
 @contextlib.asynccontextmanager
-async def api_app_lifespan(settings: Settings, app: fastapi.FastAPI) -> AsyncGenerator[None, None]:
+async def api_app_lifespan(app: fastapi.FastAPI) -> AsyncGenerator[None, None]:
+    settings: Settings = app.state.settings
     init_all(settings)
 
     async with contextlib.AsyncExitStack() as lifespan_acm:
         evmrpccli = await lifespan_acm.enter_async_context(make_evmrpc_cli(settings).manage_ctx())
-        app_state = AppState(settings=settings, acm=lifespan_acm, evmrpccli=evmrpccli)
+        app_state = AppState(
+            settings=settings,
+            acm=lifespan_acm,
+            evmrpccli=evmrpccli,
+            auth_tokens=MappingProxyType(dict(settings.opts.evmrpc_auth_tokens)),
+        )
         app_state = await _setup_ch_stats(app_state=app_state, settings=settings, acm=lifespan_acm)
 
         app.state.app_state = app_state
@@ -66,9 +77,14 @@ async def api_app_lifespan(settings: Settings, app: fastapi.FastAPI) -> AsyncGen
 
 def build_app(settings: Settings | None = None) -> fastapi.FastAPI:
     if settings is None:
-        settings = Settings()
-    app = fastapi.FastAPI(lifespan=functools.partial(api_app_lifespan, settings))
+        settings = get_settings()
+    app = fastapi.FastAPI(lifespan=api_app_lifespan, default_response_class=ORJSONResponse)
+    app.state.settings = settings
+
+    app.add_exception_handler(HTTPException, handle_http_error)
 
+    # **ordering**: the last added middleware is the outermost one.
+    app.add_middleware(TimingMiddleware)
     app.add_middleware(TraceIdMiddleware, trace_id_prefix="70")  # `p`rices
     app.add_middleware(
         CORSMiddleware,
@@ -86,31 +102,53 @@ def build_app(settings: Settings | None = None) -> fastapi.FastAPI:
 API_APP = build_app()
 
 
+class APIUvicornWorker(UvicornWorker):
+    """Gunicorn worker class for the deployed API"""
+
+    CONFIG_KWARGS: ClassVar[dict[str, Any]] = {
+        **UvicornWorker.CONFIG_KWARGS,
+        "loop": "uvloop",
+        "http": "httptools",
+        # Per-request access logs are too expensive for the proxy;
+        # the relevant request details are logged by the handlers.
+        "access_log": False,
+    }
+
+
+def _exec_gunicorn(settings: Settings) -> NoReturn:
+    """
+    Replace the current process with a gunicorn master running `APIUvicornWorker`s.
+
+    The workers build the app from the environment (see `API_APP`),
+    so only the bind / workers options are taken from `settings` here.
+    """
+    workers = settings.opts.api_deploy_workers
+    args = [
+        "gunicorn",
+        f"{__name__}:API_APP",
+        f"--worker-class={__name__}.{APIUvicornWorker.__name__}",
+        f"--workers={workers}",
+        f"--bind={settings.opts.api_bind}:{settings.opts.api_port}",
+    ]
+    LOGGER.info("Running gunicorn with %r workers", workers, extra=dict(x_args=args))
+    os.execvp(args[0], args)
+
+
 def main_run(settings: Settings | None = None) -> None:
-    app: fastapi.FastAPI | str
-    if settings is None or settings.opts.env == "dev":
-        settings = Settings()
-        # Needed as string for `reload` (but might still not work):
-        app = f"{__name__}:API_APP"
-    else:
-        # `reload` will not work.
-        app = build_app(settings)
-
-    if settings.opts.env == "dev":
-        config = uvicorn.Config(
-            app,
-            host=settings.opts.api_bind,
-            port=settings.opts.api_port,
-            reload=settings.opts.api_dev_reload,
-        )
-    else:
-        config = uvicorn.Config(
-            app,
-            host=settings.opts.api_bind,
-            port=settings.opts.api_port,
-            workers=settings.opts.api_deploy_workers,
-            log_config=None,
-        )
+    if settings is None:
+        settings = get_settings()
 
+    if settings.opts.env != "dev":
+        _exec_gunicorn(settings)
+
+    config = uvicorn.Config(
+        # Needed as string for `reload` (but might still not work):
+        f"{__name__}:API_APP",
+        host=settings.opts.api_bind,
+        port=settings.opts.api_port,
+        reload=settings.opts.api_dev_reload,
+        loop="uvloop",
+        http="httptools",
+    )
     server = uvicorn.Server(config)
     server.run()
@@ -1,22 +1,94 @@
 from __future__ import annotations
 
 import dataclasses
+import logging
+import time
 from typing import TYPE_CHECKING, Any, Self
 
+from fastapi.responses import ORJSONResponse
+from hyapp.traces import TRACE_ID_VAR
+from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
+
 if TYPE_CHECKING:
+    from collections.abc import Mapping
     from contextlib import AsyncExitStack
 
+    import starlette.requests
+    import starlette.types
+
     from .evmrpc.evmrpc_client import EVMRPCClient
     from .settings import Settings
     from .stats import RequestStatsKey, StatsUpdater
 
+LOGGER = logging.getLogger(__name__)
 
-@dataclasses.dataclass(frozen=True, kw_only=True)
+
+@dataclasses.dataclass(frozen=True, kw_only=True, slots=True)
 class AppState:
     settings: Settings
     acm: AsyncExitStack
     evmrpccli: EVMRPCClient
+    # token -> requester, frozen copy of `settings.opts.evmrpc_auth_tokens`
+    auth_tokens: Mapping[str, str]
     erp_request_stats: StatsUpdater[RequestStatsKey] | None = None
 
     def replace(self, **kwargs: Any) -> Self:
         return dataclasses.replace(self, **kwargs)
+
+
+REQUEST_START_MTS_KEY = "request_start_mts"
+
+
+def get_request_timing(request: starlette.requests.Request) -> float | None:
+    """The request handling time so far (if it went through `TimingMiddleware`)"""
+    start_mts = getattr(request.state, REQUEST_START_MTS_KEY, None)
+    if start_mts is None:
+        return None
+    return round(time.monotonic() - start_mts, 3)
+
+
+@dataclasses.dataclass()
+class TimingMiddleware:
+    """
+    Log the request handling time, including the uncaught errors.
+
+    The uncaught errors get the 500 response here, within the trace id scope
+    (rather than in the outermost `ServerErrorMiddleware`, which would also log them again).
+    """
+
+    app: starlette.types.ASGIApp
+    logger: logging.Logger = LOGGER
+
+    async def __call__(
+        self, scope: starlette.types.Scope, receive: starlette.types.Receive, send: starlette.types.Send
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.monotonic()
+        # For `get_request_timing`.
+        scope.setdefault("state", {})[REQUEST_START_MTS_KEY] = start_time
+        response_started = False
+
+        async def send_wrapped(message: starlette.types.Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapped)
+        except Exception:
+            time_diff = round(time.monotonic() - start_time, 3)
+            self.logger.exception("Uncaught error in %r", scope["path"], extra=dict(x_timing=time_diff))
+            if response_started:
+                # Too late for an error response, the server has to drop the connection.
+                raise
+            data = dict(status="Internal Error", trace_id=TRACE_ID_VAR.get())
+            response = ORJSONResponse(data, status_code=HTTP_500_INTERNAL_SERVER_ERROR)
+            await response(scope, receive, send)
+            return
+
+        time_diff = round(time.monotonic() - start_time, 3)
+        self.logger.debug("Finished %r in %.3fs", scope["path"], time_diff, extra=dict(x_timing=time_diff))
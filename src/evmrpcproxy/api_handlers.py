@@ -1,24 +1,21 @@
-import functools
 import logging
-import time
-from collections.abc import Awaitable, Callable
-from typing import TYPE_CHECKING, Annotated, Any, TypeVar, cast
+from typing import TYPE_CHECKING, Annotated, Any
 
 import fastapi
-import fastapi.responses
-from fastapi import Body, Depends, HTTPException, Query
+import fastapi.exception_handlers
+import orjson
+from fastapi import HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from hyapp.datetimes import dt_now
-from hyapp.traces import TRACE_ID_VAR
 
 from evmrpcproxy.stats import RequestContext
 
-from .api_common import AppState
-from .blockchains import CHAIN_BY_ID, CHAIN_BY_NAME
+from .api_common import AppState, get_request_timing
+from .blockchains import CHAIN_LOOKUP
 from .common import SIMPLE_CHAIN_INFOS
 from .evmrpc.evmrpc_check import evmrpc_check
 from .evmrpc.evmrpc_client import EVMRPCErrorException, EVMRPCRequestParams
 from .evmrpc.evmrpc_models import EVMRPCRequest, EVMRPCResponse
-from .settings import Settings
 from .stats import RequestStatsKey
 
 if TYPE_CHECKING:
@@ -37,68 +34,39 @@ def app_state_extract(request: fastapi.Request) -> AppState:
     return app_state
 
 
-def settings_extract(request: fastapi.Request) -> Settings:
-    return app_state_extract(request).settings
-
-
-TSettingsDep = Annotated[Settings, Depends(settings_extract)]
-
-
 @API_ROUTER.get("/ping")
-async def get_ping(request: fastapi.Request) -> dict:
-    result = dict(message="pong", url=str(request.url), headers=dict(request.headers), now=dt_now().isoformat())
+async def get_ping(request: fastapi.Request) -> fastapi.Response:
+    url = str(request.url)
+    result = dict(message="pong", url=url, headers=dict(request.headers), now=dt_now().isoformat())
     LOGGER.debug("Ping result: %r", result)
-    if "RAISE" in str(request.url):
+    if "RAISE" in url:
         raise Exception("Test raise")
-    return result
-
-
-TWrapped = TypeVar("TWrapped", bound=Callable[..., Awaitable[Any]])
-
-
-def wrap_common(title: str | None = None) -> Callable[[TWrapped], TWrapped]:
-    def wrap_common_configured(func: TWrapped) -> TWrapped:
-        actual_title = title or func.__name__
-
-        @functools.wraps(func)
-        async def wrapped_common(*args: Any, **kwargs: Any) -> Any:
-            start_time = time.monotonic()
+    return fastapi.Response(orjson.dumps(result), media_type="application/json")
 
-            try:
-                result = await func(*args, **kwargs)
-            except fastapi.exceptions.HTTPException:
-                time_diff = round(time.monotonic() - start_time, 3)
-                LOGGER.exception("Raised http error in %r", actual_title, extra=dict(x_timing=time_diff))
-                raise
-            except Exception:
-                time_diff = round(time.monotonic() - start_time, 3)
-                LOGGER.exception("Uncaught error in %r", actual_title, extra=dict(x_timing=time_diff))
-                data = dict(status="Internal Error", trace_id=TRACE_ID_VAR.get())
-                return fastapi.responses.JSONResponse(data, status_code=fastapi.status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            time_diff = round(time.monotonic() - start_time, 3)
-            LOGGER.debug("Finished %r in %.3fs", actual_title, time_diff, extra=dict(x_timing=time_diff))
-            return result
-
-        return cast("TWrapped", wrapped_common)
-
-    return wrap_common_configured
+async def handle_http_error(request: fastapi.Request, exc: Exception) -> fastapi.Response:
+    assert isinstance(exc, HTTPException)
+    log_extra = dict(x_status=exc.status_code, x_timing=get_request_timing(request))
+    if exc.status_code >= 500:
+        LOGGER.exception("Raised http error in %r", request.url.path, extra=log_extra)
+    else:
+        # Client errors (e.g. bad tokens), expected and not worth a traceback.
+        LOGGER.warning("Raised http error in %r: %r", request.url.path, exc.detail, extra=log_extra)
+    return await fastapi.exception_handlers.http_exception_handler(request, exc)
 
 
 @API_ROUTER.post("/api/v1/evmrpc_check/")
-@wrap_common()
 async def evmrpc_check_v1(
     request: fastapi.Request,
-    settings: TSettingsDep,
     *,
     token: Annotated[str, Query] = "",
     sequential: Annotated[bool, Query] = False,
     chain_names: Annotated[str, Query] = "",
 ) -> Any:
-    evmrpc_cli: EVMRPCClient = app_state_extract(request).evmrpccli
+    app_state = app_state_extract(request)
+    evmrpc_cli: EVMRPCClient = app_state.evmrpccli
 
-    auth_tokens_config = settings.opts.evmrpc_auth_tokens
-    requester = auth_tokens_config.get(token)
+    requester = app_state.auth_tokens.get(token)
     if requester is None:
         raise HTTPException(status_code=403, detail="Invalid authentication")
 
@@ -111,85 +79,89 @@ async def evmrpc_check_v1(
     )
     if not return_all:
         results = [item for item in results if not item.get("success")]
-    return fastapi.responses.JSONResponse(dict(results=results))
-
-
-COMPAT_CHAIN_NAME_MAP: dict[str, str] = {
-    "b2": "bsquared",
-}
+    return ORJSONResponse(dict(results=results))
 
 
-async def increment_req_stats(
+def increment_req_stats(
     *, app_state: AppState, request_ctx: RequestContext, req: EVMRPCRequest, success: bool, final: bool
 ) -> None:
     if not app_state.erp_request_stats:
         LOGGER.debug("Skipping request stats")
         return
 
+    # Built from the fields directly (rather than `**request_ctx.dict()`), since this runs on every request.
     key = RequestStatsKey(
+        env=request_ctx.env,
         final=final,
+        chain=request_ctx.chain,
+        requester=request_ctx.requester,
         success=success,  # placeholder
+        x_requester=request_ctx.x_requester,
+        method=request_ctx.method,
         node=req.node_config.node_name,
         try_n=req.try_n,
-        **request_ctx.dict(),
     )
 
-    await app_state.erp_request_stats.increment_stats(key)
+    app_state.erp_request_stats.increment_stats(key)
 
 
 def _get_chain_config(chain: int | str) -> dict[str, Any]:
-    chain_maybe_name = str(chain).lower()
-    chain_maybe_name = COMPAT_CHAIN_NAME_MAP.get(chain_maybe_name, chain_maybe_name)
-
-    chain_config = CHAIN_BY_NAME.get(chain_maybe_name)
-    if not chain_config and (isinstance(chain, int) or chain.isdigit()):
-        chain_config = CHAIN_BY_ID.get(int(chain))
+    chain_key = str(chain)
+    chain_config = CHAIN_LOOKUP.get(chain_key) or CHAIN_LOOKUP.get(chain_key.lower())
+    if not chain_config and chain_key.isdecimal():
+        # Non-canonical numeric ids, e.g. `"0137"`.
+        chain_config = CHAIN_LOOKUP.get(str(int(chain_key)))
     if not chain_config:
         raise HTTPException(status_code=404, detail=f"Chain not found: {chain!r}")
     return chain_config
 
 
 @API_ROUTER.post("/api/v1/evmrpc/{chain}")  # noqa: FS003 f-string missing prefix
-@wrap_common()
 async def evmrpcproxy(
     request: fastapi.Request,
-    settings: TSettingsDep,
     chain: int | str,
-    data: Annotated[Any, Body()],
     log_extra: str = "",
     token: Annotated[str, Query] = "",
     *,
     mangle_getlogs: Annotated[bool, Query] = False,
 ) -> Any:
     app_state = app_state_extract(request)
+    settings = app_state.settings
     evmrpc_cli = app_state.evmrpccli
 
-    auth_tokens_config = settings.opts.evmrpc_auth_tokens
-    requester = auth_tokens_config.get(token)
+    requester = app_state.auth_tokens.get(token)
     if requester is None:
         raise HTTPException(status_code=403, detail="Invalid authentication")
 
     chain_config = _get_chain_config(chain)
-    chain_name = chain_config["shortname"].lower()
+    chain_name = chain_config["shortname_lower"]
+    query_params = request.query_params
     # A debug parameter for use in case of suspected difference between direct and proxied requests.
-    node_name = request.query_params.get("x_node_name")
+    node_name = query_params.get("x_node_name")
     # Non-authoritative optional requester comment.
-    x_requester = request.query_params.get("x_requester") or "-"
+    x_requester = query_params.get("x_requester") or "-"
+
+    # Parsed directly (rather than with a `Body()` parameter) to use `orjson` and skip the FastAPI validation.
+    try:
+        data = orjson.loads(await request.body())
+    except orjson.JSONDecodeError as exc:
+        raise HTTPException(status_code=400, detail="Invalid JSON body") from exc
 
-    getattr(request.app.state, "erp_upstream_stats", None)
+    data_type = type(data)
+    method = "batch" if data_type is list else data.get("method", "-") if data_type is dict else "???"
     request_ctx = RequestContext(
         env=settings.opts.stats_env_name or settings.opts.env,
         chain=chain_name,
         requester=requester,
         x_requester=x_requester,
-        method="batch" if isinstance(data, list) else data.get("method", "-") if isinstance(data, dict) else "???",
+        method=method,
     )
     context = request_ctx.dict()
     if log_extra:
         context["x_extra"] = log_extra
 
     async def error_hook(*, req: EVMRPCRequest, exc: Exception, final: bool) -> None:
-        await increment_req_stats(app_state=app_state, request_ctx=request_ctx, req=req, success=False, final=final)
+        increment_req_stats(app_state=app_state, request_ctx=request_ctx, req=req, success=False, final=final)
 
     try:
         evmrpc_resp = await evmrpc_cli.request(
@@ -211,18 +183,16 @@ async def evmrpcproxy(
 
         # Note that the stats for this case are handled through `error_hook`
 
-        return fastapi.responses.JSONResponse(
+        return ORJSONResponse(
             resp_data,
             status_code=exc.last_status or fastapi.status.HTTP_500_INTERNAL_SERVER_ERROR,
         )
 
-    await increment_req_stats(
-        app_state=app_state, request_ctx=request_ctx, req=evmrpc_resp.req, success=True, final=True
-    )
+    increment_req_stats(app_state=app_state, request_ctx=request_ctx, req=evmrpc_resp.req, success=True, final=True)
 
     resp_headers: dict[str, str] = {
         "X-EVMRPC-Node": evmrpc_resp.req.node_config.node_name,
         "X-EVMRPC-Attempt": str(evmrpc_resp.req.try_n),
     }
 
-    return fastapi.responses.JSONResponse(evmrpc_resp.data, headers=resp_headers)
+    return ORJSONResponse(evmrpc_resp.data, headers=resp_headers)
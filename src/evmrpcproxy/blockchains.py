@@ -4,6 +4,19 @@ from typing import Any
 import orjson
 
 HERE = Path(__file__).parent
-CHAINS: list[dict[str, Any]] = list(orjson.loads((HERE / "blockchains.json").read_text()).values())
+CHAINS: list[dict[str, Any]] = list(orjson.loads((HERE / "blockchains.json").read_bytes()).values())
+for _chain_info in CHAINS:
+    _chain_info["shortname_lower"] = _chain_info["shortname"].lower()
 CHAIN_BY_ID = {int(chain_info["id"]): chain_info for chain_info in CHAINS}
-CHAIN_BY_NAME = {chain_info["shortname"].lower(): chain_info for chain_info in CHAINS}
+CHAIN_BY_NAME = {chain_info["shortname_lower"]: chain_info for chain_info in CHAINS}
+
+COMPAT_CHAIN_NAME_MAP: dict[str, str] = {
+    "b2": "bsquared",
+}
+# All the accepted chain references (numeric id, lowercase name, compat alias) -> chain info.
+# Names take precedence over ids, same as in the lookup order.
+CHAIN_LOOKUP: dict[str, dict[str, Any]] = {
+    **{str(chain_id): chain_info for chain_id, chain_info in CHAIN_BY_ID.items()},
+    **CHAIN_BY_NAME,
+    **{alias: CHAIN_BY_NAME[target] for alias, target in COMPAT_CHAIN_NAME_MAP.items()},
+}
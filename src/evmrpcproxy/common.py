@@ -4,9 +4,9 @@ from typing import Any
 from .blockchains import CHAIN_BY_NAME
 from .evmrpc.evmrpc_check import SimpleChainInfo
 from .evmrpc.evmrpc_client import EVMRPCClient
-from .evmrpc.evmrpc_config import EVMRPC_CONFIG, EVMRPC_CONFIG_PUBLIC
+from .evmrpc.evmrpc_config import get_evmrpc_config, get_evmrpc_config_public
 from .evmrpc.evmrpc_config_model import EVMRPCConfig, EVMRPCSecrets
-from .settings import Settings
+from .settings import Settings, get_settings
 
 LOGGER = logging.getLogger(__name__)
 
@@ -26,8 +26,10 @@ _PLACEHOLDER = "__ERP_SECRET_PLACEHOLDER__"
 
 
 def combine_config_with_public(
-    config: EVMRPCConfig, secrets: EVMRPCSecrets, public_config: EVMRPCConfig = EVMRPC_CONFIG_PUBLIC
+    config: EVMRPCConfig, secrets: EVMRPCSecrets, public_config: EVMRPCConfig | None = None
 ) -> EVMRPCConfig:
+    if public_config is None:
+        public_config = get_evmrpc_config_public()
     secrets_with_placeholder = EVMRPCSecrets.model_validate(
         {key: val or _PLACEHOLDER for key, val in secrets.model_dump().items()}
     )
@@ -46,7 +48,7 @@ def combine_config_with_public(
 
 
 def make_evmrpc_cli(settings: Settings, **kwargs: Any) -> EVMRPCClient:
-    config = settings.opts.evmrpc_config or EVMRPC_CONFIG
+    config = settings.opts.evmrpc_config or get_evmrpc_config()
     secrets = settings.opts.evmrpc_secrets
     if not secrets:
         LOGGER.error("No EVMRPC secrets configured")
@@ -61,7 +63,7 @@ def make_evmrpc_cli(settings: Settings, **kwargs: Any) -> EVMRPCClient:
 
 
 def dump_rendered_config() -> dict:
-    settings = Settings()
+    settings = get_settings()
     evmrpc_cli = make_evmrpc_cli(settings)
     return {
         f"{node.chain_name}__{node.node_name}": node.get_url(evmrpc_cli.evmrpc_secrets)
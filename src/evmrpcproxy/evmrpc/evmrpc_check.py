@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 import asyncio
+import functools
+from collections import defaultdict
 from typing import TYPE_CHECKING, Any, NamedTuple
 
 from hyapp.aio import aiogather_it
-from hyapp.funcutils import groupby
 from typing_extensions import TypedDict
 
 if TYPE_CHECKING:
@@ -33,6 +34,24 @@ class EVMRPCCheckResult(TypedDict):
 # `Multicall3.aggregate3([])`
 CHECK_REQ_MC_CALLDATA = "0x82ad56cb00000000000000000000000000000000000000000000000000000000000000200000000000000000000000000000000000000000000000000000000000000000"
 CHECK_RES_MC_DATA = "0x00000000000000000000000000000000000000000000000000000000000000200000000000000000000000000000000000000000000000000000000000000000"
+CHECK_REQ_DATA_BASE = (
+    {"jsonrpc": "2.0", "id": 1, "method": "eth_chainId", "params": []},
+    {"jsonrpc": "2.0", "id": 2, "method": "eth_blockNumber", "params": []},
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def _get_check_req_data(multicall3_address: str | None) -> list[dict[str, Any]]:
+    """Check request batch for a chain; shared between the calls, should not be mutated"""
+    if not multicall3_address:
+        return [*CHECK_REQ_DATA_BASE]
+    req_mc = {
+        "jsonrpc": "2.0",
+        "id": 3,
+        "method": "eth_call",
+        "params": [{"to": multicall3_address, "data": CHECK_REQ_MC_CALLDATA}, "latest"],
+    }
+    return [*CHECK_REQ_DATA_BASE, req_mc]
 
 
 async def evmrpc_check(
@@ -43,6 +62,7 @@ async def evmrpc_check(
     sequential: bool = False,
     max_block_number_lag: int | None = 10,
     per_chain_pause_sec: float = 0.0,
+    max_concurrency_per_chain: int = 4,
 ) -> list[EVMRPCCheckResult]:
     evmrpc_config = evmrpc_cli.evmrpc_config
     node_cfgs = [
@@ -54,23 +74,14 @@ async def evmrpc_check(
         for node_name in providers
     ]
 
-    req_data = [
-        {"jsonrpc": "2.0", "id": 1, "method": "eth_chainId", "params": []},
-        {"jsonrpc": "2.0", "id": 2, "method": "eth_blockNumber", "params": []},
-    ]
+    # Limit the concurrent requests per chain, while still checking the chains in parallel.
+    chain_semaphores: defaultdict[str, asyncio.Semaphore] = defaultdict(
+        lambda: asyncio.Semaphore(max_concurrency_per_chain)
+    )
 
     async def proc_one(chain_name: str, node_name: str) -> EVMRPCCheckResult:
         chain_cfg = chain_by_name[chain_name]
-
-        chain_req_data = req_data
-        if chain_cfg.multicall3_address:
-            req_mc = {
-                "jsonrpc": "2.0",
-                "id": 3,
-                "method": "eth_call",
-                "params": [{"to": chain_cfg.multicall3_address, "data": CHECK_REQ_MC_CALLDATA}, "latest"],
-            }
-            chain_req_data = [*chain_req_data, req_mc]
+        chain_req_data = _get_check_req_data(chain_cfg.multicall3_address)
 
         result = EVMRPCCheckResult(
             chain=chain_name,
@@ -82,15 +93,18 @@ async def evmrpc_check(
             success=False,
         )
         try:
-            resp = await evmrpc_cli.request(
-                chain_name=chain_name,
-                data=chain_req_data,
-                node_name=node_name,
-                context={"requester": "__evmrpc_check__"},
-            )
+            async with chain_semaphores[chain_name]:
+                resp = await evmrpc_cli.request(
+                    chain_name=chain_name,
+                    data=chain_req_data,
+                    node_name=node_name,
+                    context={"requester": "__evmrpc_check__"},
+                )
             result["res"] = resp.data
             assert isinstance(resp.data, list)
-            res_by_id = {item.get("id"): item for item in resp.data}
+            # Batch responses are allowed to be in any order, so match them by the (integer) ids.
+            # A malformed item fails the check anyway.
+            res_by_id = {item["id"]: item for item in resp.data}
 
             chain_id = int(res_by_id[1]["result"], 16)
             if chain_id != chain_cfg.id:
@@ -124,10 +138,11 @@ async def evmrpc_check(
         results = await aiogather_it(proc_one(chain_name, node_name) for chain_name, node_name in node_cfgs)
 
     if max_block_number_lag is not None:
-        max_bn_by_chain = {
-            chain: max([res["block_number"] or 0 for res in chain_res if res.get("block_number")], default=0)
-            for chain, chain_res in groupby((res["chain"], res) for res in results).items()
-        }
+        max_bn_by_chain: dict[str, int] = {}
+        for res in results:
+            bn = res.get("block_number")
+            if bn and bn > max_bn_by_chain.get(res["chain"], 0):
+                max_bn_by_chain[res["chain"]] = bn
         for res in results:
             bn = res.get("block_number")
             max_bn = max_bn_by_chain.get(res["chain"])
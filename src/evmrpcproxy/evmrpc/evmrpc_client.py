@@ -4,8 +4,11 @@ import contextlib
 import dataclasses
 import logging
 import time
+from collections import deque
 from typing import TYPE_CHECKING, Any, Self, Sequence
 
+import aiohttp
+import orjson
 from hyapp.https import HTTPClient
 
 from .evmrpc_middleware import (
@@ -17,6 +20,7 @@ from .evmrpc_middleware import (
     TEVMRPCHandler,
 )
 from .evmrpc_models import (
+    DEFAULT_REQUEST_PARAMS,
     ErrorHookCallable,
     EVMRPCErrorException,
     EVMRPCErrorResponseException,
@@ -44,7 +48,7 @@ if TYPE_CHECKING:
 
 LOGGER = logging.getLogger(__name__)
 
-DEFAULT_MIDDLEWARES: Sequence[type[EVMRPCMiddlewareBase]] = [
+DEFAULT_MIDDLEWARES: Sequence[type[EVMRPCMiddlewareBase]] = (
     # **ordering**: the topmost one calls the next one in chain
     # (same as MRO and same as `@decorator`).
     # Pick out and handle `ext_estimateGas` requests.
@@ -57,7 +61,7 @@ DEFAULT_MIDDLEWARES: Sequence[type[EVMRPCMiddlewareBase]] = [
     # Make separate requests on bouncebit which doesn't support batches.
     # This one should (probably) be at the bottom.
     EVMRPCUnbatchMiddleware,
-]
+)
 
 
 def _make_http_cli() -> HTTPClient:
@@ -69,6 +73,28 @@ def _make_http_cli() -> HTTPClient:
     return HTTPClient(retry_attempts=1, max_resp_log_len=16384, logger=logger)
 
 
+@dataclasses.dataclass()
+class NodeStats:
+    """Per-node health, used to skip the degraded nodes on rotation"""
+
+    # Exponentially weighted moving average of the successful request times.
+    latency_ewma: float | None = None
+    # The `time.monotonic()` of the last `latency_ewma` update.
+    latency_mts: float = 0.0
+    backoff_sec: float = 0.0
+    # Until this `time.monotonic()` value, the node is only used if there's no better option.
+    backoff_until_mts: float = 0.0
+
+    def is_backed_off(self, now_mts: float) -> bool:
+        return now_mts < self.backoff_until_mts
+
+    def get_latency(self, now_mts: float, max_age_sec: float) -> float | None:
+        """The latency EWMA, unless it's too old to go by (e.g. for the skipped slow nodes)"""
+        if now_mts - self.latency_mts > max_age_sec:
+            return None
+        return self.latency_ewma
+
+
 @dataclasses.dataclass()
 class EVMRPCClient:
     evmrpc_config: EVMRPCConfig
@@ -84,6 +110,21 @@ class EVMRPCClient:
     max_resp_log_size: int = 16_000
     middlewares: Sequence[type[EVMRPCMiddlewareBase]] = dataclasses.field(default_factory=lambda: DEFAULT_MIDDLEWARES)
 
+    # Connection pool options for the session created in `manage_ctx`.
+    # The `aiohttp` default is a total of 100 connections, which the unbatched / fanned-out requests can exceed.
+    http_pool_limit: int = 512
+    http_keepalive_timeout_sec: float = 30.0
+    http_dns_cache_ttl_sec: int = 60
+
+    # Node health tracking, see `_rotate`.
+    node_backoff_min_sec: float = 1.0
+    node_backoff_max_sec: float = 60.0
+    node_latency_ewma_alpha: float = 0.2
+    # Nodes slower than the fastest viable one by this factor are skipped on rotation.
+    node_max_latency_ratio: float = 2.0
+    # Older latencies are disregarded, so that the skipped slow nodes get re-tried eventually.
+    node_latency_max_age_sec: float = 60.0
+
     logger: logging.Logger = LOGGER
 
     @property
@@ -91,12 +132,47 @@ class EVMRPCClient:
         return self.evmrpc_config.chains
 
     def __post_init__(self) -> None:
-        self.rotation_order = {chain_name: list(nodes) for chain_name, nodes in self.evmrpc_chains.items()}
+        self.rotation_order = {chain_name: deque(nodes) for chain_name, nodes in self.evmrpc_chains.items()}
+        # (chain_name, node_name) -> stats
+        self.node_stats = {
+            (chain_name, node_name): NodeStats()
+            for chain_name, nodes in self.evmrpc_chains.items()
+            for node_name in nodes
+        }
+        # (chain_name, node_name) -> (rendered url, headers); the secrets are static, so the urls are too.
+        self._node_targets: dict[tuple[str, str], tuple[str, dict[str, str]]] = {}
+        # chain_name -> middleware onion (built on the first request)
+        self._chain_handlers: dict[str, TEVMRPCHandler] = {}
+        # All the layers of the `_chain_handlers`, see `_close_middlewares`.
+        self._middlewares: list[EVMRPCMiddlewareBase] = []
 
     @contextlib.asynccontextmanager
     async def manage_ctx(self) -> AsyncGenerator[Self, None]:
-        async with self.http_cli:
-            yield self
+        if self.http_cli.session is not None:
+            # Managed outside.
+            try:
+                yield self
+            finally:
+                await self._close_middlewares()
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=self.http_pool_limit,
+            keepalive_timeout=self.http_keepalive_timeout_sec,
+            ttl_dns_cache=self.http_dns_cache_ttl_sec,
+        )
+        async with aiohttp.ClientSession(connector=connector) as session:
+            self.http_cli.session = session
+            try:
+                yield self
+            finally:
+                await self._close_middlewares()
+                self.http_cli.session = None
+
+    async def _close_middlewares(self) -> None:
+        """Finish the middlewares' background work (the cached middlewares outlive the session)"""
+        for middleware in self._middlewares:
+            await middleware.aclose()
 
     def _make_req_log_context(self, data: Any) -> dict[str, Any]:
         return dumpcut(data=data, max_length=self.max_req_log_size, full_key="x_request", cut_key="x_request_cut")
@@ -116,11 +192,67 @@ class EVMRPCClient:
             raise NoNodesAvailable(chain_name)
 
         if rotate:
-            # mutate inplace
-            names.append(names.pop(0))
+            self._rotate(chain_name, names)
 
         return self.evmrpc_chains[chain_name][names[0]]
 
+    def _rotate(self, chain_name: str, names: deque[str]) -> None:
+        """
+        Rotate (inplace) to the next node that is neither backed off nor too slow,
+        or simply to the next node if there are no such nodes.
+        """
+        now_mts = time.monotonic()
+        max_age_sec = self.node_latency_max_age_sec
+        stats_by_name = {name: self.node_stats[chain_name, name] for name in names}
+        latency_by_name = {name: stats.get_latency(now_mts, max_age_sec) for name, stats in stats_by_name.items()}
+        latencies = [
+            latency
+            for name, latency in latency_by_name.items()
+            if latency is not None and not stats_by_name[name].is_backed_off(now_mts)
+        ]
+        max_latency = min(latencies) * self.node_max_latency_ratio if latencies else None
+
+        for step in range(1, len(names)):
+            name = names[step]
+            if stats_by_name[name].is_backed_off(now_mts):
+                continue
+            latency = latency_by_name[name]
+            if max_latency is not None and latency is not None and latency > max_latency:
+                continue
+            names.rotate(-step)
+            return
+
+        names.rotate(-1)
+
+    def _record_node_error(self, node_config: EVMRPCNodeConfig) -> None:
+        stats = self.node_stats[node_config.chain_name, node_config.node_name]
+        stats.backoff_sec = min(max(stats.backoff_sec * 2, self.node_backoff_min_sec), self.node_backoff_max_sec)
+        stats.backoff_until_mts = time.monotonic() + stats.backoff_sec
+
+    def _record_node_success(self, node_config: EVMRPCNodeConfig) -> None:
+        stats = self.node_stats[node_config.chain_name, node_config.node_name]
+        # Decay rather than reset the backoff, so that a flapping node gets the longer backoffs.
+        stats.backoff_sec = stats.backoff_sec / 2 if stats.backoff_sec >= self.node_backoff_min_sec * 2 else 0.0
+        stats.backoff_until_mts = 0.0
+
+    def _record_node_latency(self, node_config: EVMRPCNodeConfig, time_sec: float) -> None:
+        """Per upstream call (rather than per top-level request, which can involve several or large calls)"""
+        stats = self.node_stats[node_config.chain_name, node_config.node_name]
+        now_mts = time.monotonic()
+        prev_latency = stats.get_latency(now_mts, self.node_latency_max_age_sec)
+        alpha = self.node_latency_ewma_alpha
+        stats.latency_ewma = time_sec if prev_latency is None else alpha * time_sec + (1 - alpha) * prev_latency
+        stats.latency_mts = now_mts
+
+    def _get_node_target(self, node_config: EVMRPCNodeConfig) -> tuple[str, dict[str, str]]:
+        key = (node_config.chain_name, node_config.node_name)
+        target = self._node_targets.get(key)
+        if target is None:
+            url = node_config.get_url(self.evmrpc_secrets)
+            headers = {"Content-Type": "application/json", **dict(node_config.headers)}
+            target = self._node_targets[key] = (url, headers)
+        return target
+
     def _check_response(self, resp: EVMRPCResponse) -> None:
         errors = EVMRPCResponseError.parse(resp)
         if not errors:
@@ -145,12 +277,16 @@ class EVMRPCClient:
         # same as non-error responses.
 
     async def _request_one_call(self, req: EVMRPCRequest) -> EVMRPCResponse:
-        url = req.node_config.get_url(self.evmrpc_secrets)
+        url, headers = self._get_node_target(req.node_config)
+        # Serialized here, since `aiohttp` would otherwise use the stdlib `json`.
+        # (the response is parsed with `orjson` in the `HTTPResponse.json`)
+        call_start_time = time.monotonic()
         http_resp = await self.http_cli.req(
-            url=url, method="post", headers=req.node_config.headers, json=req.data, require_ok=False
+            url=url, method="post", headers=headers, data=orjson.dumps(req.data), require_ok=False
         )
+        call_time = time.monotonic() - call_start_time
         http_resp_ok = http_resp.status == 200
-        if self.do_upstream_debug:
+        if self.do_upstream_debug and self.logger.isEnabledFor(logging.DEBUG):
             self.logger.debug(
                 "EVMRPC upstream response",
                 extra={
@@ -161,12 +297,17 @@ class EVMRPCClient:
                 },
             )
         try:
+            # Note: parsed from the bytes with `orjson`.
             resp_data = http_resp.json()
             if not isinstance(resp_data, (dict, list)):
                 raise ValueError("Expected a list or dict response")
         except Exception as exc:
-            resp_data = http_resp.content.decode("utf-8", errors="replace")
-            resp = EVMRPCResponse(data={"__raw__": resp_data}, req=req)
+            # Non-JSON responses (e.g. HTML error pages) can be large, and these end up in the logs.
+            content = http_resp.content
+            resp_raw = content[: self.max_resp_log_size].decode("utf-8", errors="replace")
+            if len(content) > self.max_resp_log_size:
+                resp_raw += "…"
+            resp = EVMRPCResponse(data={"__raw__": resp_raw}, req=req)
             raise EVMRPCErrorException(
                 exc=None,
                 last_response=resp,
@@ -195,24 +336,39 @@ class EVMRPCClient:
                 req=req,
             )
 
+        if not resp.has_errors:
+            self._record_node_latency(req.node_config, call_time)
         return resp
 
-    async def _request_one_node(self, req: EVMRPCRequest) -> EVMRPCResponse:
+    def _build_chain_handler(self, chain_name: str) -> TEVMRPCHandler:
         straight_handler: TEVMRPCHandler = self._request_one_call
-        all_nodes = self.get_all_node_configs(req.node_config.chain_name)
+        # The middlewares only use this as a set of nodes, so the rotation doesn't invalidate it.
+        all_nodes = self.get_all_node_configs(chain_name)
 
         next_handler: TEVMRPCHandler = straight_handler
         middleware_names: list[str] = []
         # Since this is wrapping rather than calling, start from the bottom one.
         for middleware_cls in self.middlewares[::-1]:
             middleware = middleware_cls(
-                next_handler=next_handler, straight_handler=straight_handler, all_nodes=all_nodes, logger=self.logger
+                next_handler=next_handler,
+                straight_handler=straight_handler,
+                all_nodes=all_nodes,
+                http_cli=self.http_cli,
+                logger=self.logger,
             )
             middleware_names.append(middleware.name)
+            self._middlewares.append(middleware)
             next_handler = middleware.handle
 
-        self.logger.debug("Middleware onion", extra={"x_middlewares": middleware_names[::-1]})
-        return await next_handler(req)
+        self.logger.debug("Middleware onion", extra={"chain": chain_name, "x_middlewares": middleware_names[::-1]})
+        return next_handler
+
+    async def _request_one_node(self, req: EVMRPCRequest) -> EVMRPCResponse:
+        chain_name = req.node_config.chain_name
+        handler = self._chain_handlers.get(chain_name)
+        if handler is None:
+            handler = self._chain_handlers[chain_name] = self._build_chain_handler(chain_name)
+        return await handler(req)
 
     async def request(
         self,
@@ -221,11 +377,10 @@ class EVMRPCClient:
         node_name: str | None = None,
         *,
         context: dict | None = None,
-        req_params: EVMRPCRequestParams = EVMRPCRequestParams(),
+        req_params: EVMRPCRequestParams = DEFAULT_REQUEST_PARAMS,
         error_hook: ErrorHookCallable | None = None,
     ) -> EVMRPCResponse:
         common_log_context = {"chain": chain_name, **(context or {})}
-        req_log_context = self._make_req_log_context(data)
 
         retry_attempts = 1 if node_name else self.retry_attempts
         node_config = self.evmrpc_chains[chain_name][node_name] if node_name else self.get_node_config(chain_name)
@@ -244,6 +399,7 @@ class EVMRPCClient:
             try:
                 resp = await self._request_one_node(req)
             except Exception as exc:
+                self._record_node_error(node_config)
                 final = try_n + 1 >= retry_attempts
                 end_time = time.monotonic()
                 log_extra = {
@@ -257,7 +413,7 @@ class EVMRPCClient:
                     await error_hook(req=req, exc=exc, final=final)
 
                 if final:
-                    self.logger.error("EVMRPC final error", extra={**req_log_context, **log_extra})
+                    self.logger.error("EVMRPC final error", extra={**self._make_req_log_context(data), **log_extra})
 
                     # Return the RPC-level error responses directly.
                     if isinstance(exc, EVMRPCErrorResponseException):
@@ -273,18 +429,22 @@ class EVMRPCClient:
             # force node rotation anyway, just in case.
             if resp.has_errors:
                 self.get_node_config(chain_name, rotate=True)
+            else:
+                self._record_node_success(node_config)
 
             end_time = time.monotonic()
-            self.logger.info(
-                "EVMRPC result",
-                extra={
-                    **req_log_context,
-                    **self._make_resp_log_context(resp.data),
-                    **current_try_log_context,
-                    "x_node_time": round(end_time - node_start_time, 3),
-                    "x_total_time": round(end_time - start_time, 3),
-                },
-            )
+            # The request / response dumps are relatively expensive, so skip them if the log would be dropped anyway.
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(
+                    "EVMRPC result",
+                    extra={
+                        **self._make_req_log_context(data),
+                        **self._make_resp_log_context(resp.data),
+                        **current_try_log_context,
+                        "x_node_time": round(end_time - node_start_time, 3),
+                        "x_total_time": round(end_time - start_time, 3),
+                    },
+                )
             return resp
 
         raise Exception("Logic error: this line should never be reached")
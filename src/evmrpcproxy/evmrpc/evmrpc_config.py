@@ -1,28 +1,35 @@
+import functools
 import urllib.parse
 from pathlib import Path
 
-import yaml
-
 from ..blockchains import CHAIN_BY_NAME
 from .evmrpc_config_model import EVMRPCConfig, EVMRPCSecrets
+from .utils import yaml_safe_load
 
 HERE = Path(__file__).parent
-# To consider: load lazily, validate in tests.
-EVMRPC_CONFIG_RAW = yaml.safe_load((HERE / "evmrpc_config.yaml").read_text())
-EVMRPC_CONFIG = EVMRPCConfig.model_validate(EVMRPC_CONFIG_RAW)
-EVMRPC_CONFIG.validate_templates(EVMRPCSecrets())
 
-EVMRPC_CONFIG_PUBLIC_RAW = {
-    chain_name: {
-        "x_chain_id": chain_info["id"],
-        **{
-            urllib.parse.urlparse(rpc_url).hostname: {"url": rpc_url, "max_blocks_distance": 100}
-            for rpc_url in [
-                *([chain_info["rpc_url"]] if chain_info.get("rpc_url") else []),
-                *(chain_info.get("rpc_extra_urls") or []),
-            ]
-        },
+
+@functools.cache
+def get_evmrpc_config() -> EVMRPCConfig:
+    raw = yaml_safe_load((HERE / "evmrpc_config.yaml").read_bytes())
+    config = EVMRPCConfig.model_validate(raw)
+    config.validate_templates(EVMRPCSecrets())
+    return config
+
+
+@functools.cache
+def get_evmrpc_config_public() -> EVMRPCConfig:
+    raw = {
+        chain_name: {
+            "x_chain_id": chain_info["id"],
+            **{
+                urllib.parse.urlparse(rpc_url).hostname: {"url": rpc_url, "max_blocks_distance": 100}
+                for rpc_url in [
+                    *([chain_info["rpc_url"]] if chain_info.get("rpc_url") else []),
+                    *(chain_info.get("rpc_extra_urls") or []),
+                ]
+            },
+        }
+        for chain_name, chain_info in CHAIN_BY_NAME.items()
     }
-    for chain_name, chain_info in CHAIN_BY_NAME.items()
-}
-EVMRPC_CONFIG_PUBLIC = EVMRPCConfig.model_validate(EVMRPC_CONFIG_PUBLIC_RAW)
+    return EVMRPCConfig.model_validate(raw)
@@ -1,7 +1,8 @@
 from typing import Any, Self
 
 import pydantic
-import yaml
+
+from .utils import yaml_safe_load
 
 
 class EVMRPCSecrets(pydantic.BaseModel, frozen=True):
@@ -69,6 +70,11 @@ class EVMRPCNodeConfig(pydantic.BaseModel, frozen=True):
     headers: tuple[tuple[str, str], ...] = ()
 
     supports_batch: bool = True
+    # Max concurrent upstream requests when splitting a batch for a node without `supports_batch`.
+    unbatch_max_concurrency: int = 16
+    # Merge the concurrent `ext_estimateGas` node requests into shared batches
+    # (fewer upstream requests, but up to a few ms of extra latency and larger batches).
+    coalesce_gas_requests: bool = False
 
     # See: https://www.quicknode.com/docs/ethereum/bb_getAddress
     supports_blockbook: bool = False
@@ -98,7 +104,7 @@ class EVMRPCConfig(pydantic.BaseModel, frozen=True):
         if not value:
             return {}
 
-        raw_data = yaml.safe_load(value) if isinstance(value, str) else value
+        raw_data = yaml_safe_load(value) if isinstance(value, str) else value
         return {
             chain_name: {
                 node_name: EVMRPCNodeConfig.load_from_config(chain_name, node_name, node_config)
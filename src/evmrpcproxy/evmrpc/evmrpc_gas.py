@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import asyncio
 import dataclasses
+import functools
 import logging
 import time
 from collections.abc import Awaitable, Callable
 from typing import TYPE_CHECKING, Any, TypedDict
 
+from hyapp.aio import aiogather
 from hyapp.https import HTTPClient
 
 if TYPE_CHECKING:
@@ -89,6 +92,12 @@ class GasError(Exception):
     """
 
 
+@functools.lru_cache(maxsize=256)
+def _pct_multiplier(extra_pct: float, frac_mult: int) -> int:
+    """Integer multiplier (over `frac_mult`) for `add_pct`; the set of used percentages is small"""
+    return frac_mult + int(extra_pct * frac_mult // 100)
+
+
 def add_pct(value: int, extra_pct: float, frac_mult: int = 10_000) -> int:
     """
     >>> add_pct(1234, 10)
@@ -100,8 +109,7 @@ def add_pct(value: int, extra_pct: float, frac_mult: int = 10_000) -> int:
     >>> int(1234 * 0.9)
     1110
     """
-    extra_frac = int(extra_pct * frac_mult // 100)
-    return value * (frac_mult + extra_frac) // frac_mult
+    return value * _pct_multiplier(extra_pct, frac_mult) // frac_mult
 
 
 def add_pct_hex(value: str, extra_pct: float, frac_mult: int = 10_000) -> str:
@@ -175,24 +183,30 @@ def _add_extra_gas_price_and_units(
     gas_priority_fee_extra_pct: float,
     gas_units_extra_pct: float,
 ) -> TxParamsSimple:
-    tx_params = tx_params.copy()
+    updates = TxParamsSimple()
 
-    if tx_params.get("gasPrice") and gas_price_extra_pct:
-        tx_params["gasPrice"] = add_pct_hex(tx_params.get("gasPrice", "0x0"), gas_price_extra_pct)
+    gas_price = tx_params.get("gasPrice")
+    if gas_price and gas_price_extra_pct:
+        updates["gasPrice"] = add_pct_hex(gas_price, gas_price_extra_pct)
 
-    if tx_params.get("maxFeePerGas") and gas_price_extra_pct:
-        tx_params["maxFeePerGas"] = add_pct_hex(tx_params.get("maxFeePerGas", "0x0"), gas_price_extra_pct)
+    max_fee_per_gas = tx_params.get("maxFeePerGas")
+    if max_fee_per_gas and gas_price_extra_pct:
+        updates["maxFeePerGas"] = add_pct_hex(max_fee_per_gas, gas_price_extra_pct)
 
     # The `maxPriorityFeePerGas` extra isn't necessarily useful, but should be harmless.
-    if tx_params.get("maxPriorityFeePerGas") and gas_priority_fee_extra_pct:
-        tx_params["maxPriorityFeePerGas"] = add_pct_hex(
-            tx_params.get("maxPriorityFeePerGas", "0x0"), gas_priority_fee_extra_pct
-        )
+    max_priority_fee_per_gas = tx_params.get("maxPriorityFeePerGas")
+    if max_priority_fee_per_gas and gas_priority_fee_extra_pct:
+        updates["maxPriorityFeePerGas"] = add_pct_hex(max_priority_fee_per_gas, gas_priority_fee_extra_pct)
 
-    if tx_params.get("gas") and gas_units_extra_pct:
-        tx_params["gas"] = add_pct_hex(tx_params.get("gas", "0x0"), gas_units_extra_pct)
+    gas = tx_params.get("gas")
+    if gas and gas_units_extra_pct:
+        updates["gas"] = add_pct_hex(gas, gas_units_extra_pct)
 
-    return tx_params
+    if not updates:
+        return tx_params
+    result = tx_params.copy()
+    result.update(updates)
+    return result
 
 
 async def _build_gas_units(tx_params: TxParamsSimple, req_node: TSimpleEVMRPCHandler) -> TxParamsSimple:
@@ -218,11 +232,18 @@ PRE_EIP1559_CHAIN_IDS: set[int] = {
 }
 
 
+# merlin, linea: `from` is required for estimate-gas.
+FROM_REQUIRED_CHAIN_IDS: frozenset[int] = frozenset({4200, 59144})
+
 POLYGON_GASSTATION_URL = "https://gasstation.polygon.technology/v2"
 POLYGONZKEVM_GASSTATION_URL = "https://gasstation.polygon.technology/zkevm"
 # Very simple in-memory cache (from a limited amount of keys)
-# url -> (timestamp, response_data)
+# url -> (`time.monotonic()`, response_data)
 GASSTATION_CACHE: dict[str, tuple[float, Any]] = {}
+# Only a couple of urls are expected, so this is just a safeguard.
+GASSTATION_CACHE_MAX_SIZE = 8
+# url -> in-progress request, to avoid concurrent requests for the same url
+GASSTATION_INFLIGHT: dict[str, asyncio.Task[dict]] = {}
 
 
 @dataclasses.dataclass(frozen=True, kw_only=True)
@@ -240,7 +261,8 @@ class W3GasHelper:
 
     async def _request_gasstation_full(self, url: str) -> dict:
         resp = await self.http_cli.req(url)
-        self.logger.debug("Gasstation response from %r: %r", url, resp.content.decode("utf-8", errors="replace"))
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Gasstation response from %r: %r", url, resp.content.decode("utf-8", errors="replace"))
         rd = resp.json_untyped()
         if not isinstance(rd, dict):
             raise ValueError(f"Gasstation returned non-dict from {url=!r}: {rd=!r}")
@@ -250,7 +272,7 @@ class W3GasHelper:
         cache = GASSTATION_CACHE.get(url)
         if cache:
             ts, data = cache
-            age = time.time() - ts
+            age = time.monotonic() - ts
             if age < self.gasstation_cache_ttl_sec:
                 self.logger.debug("Gasstation cache hit: url=%r, age=%r", url, age)
                 return data
@@ -258,10 +280,31 @@ class W3GasHelper:
         else:
             self.logger.debug("Gasstation cache miss: url=%r", url)
 
-        ts = time.time()
-        data = await self._request_gasstation_full(url)
-        GASSTATION_CACHE[url] = (ts, data)
-        return data
+        inflight = GASSTATION_INFLIGHT.get(url)
+        if inflight is None:
+            inflight = self._start_gasstation_request(url)
+        else:
+            self.logger.debug("Gasstation request already in progress: url=%r", url)
+        # Shielded so that a cancelled requester doesn't cancel the request for the others.
+        return await asyncio.shield(inflight)
+
+    def _start_gasstation_request(self, url: str) -> asyncio.Task[dict]:
+        ts = time.monotonic()
+        task = asyncio.create_task(self._request_gasstation_full(url))
+
+        def on_done(task: asyncio.Task[dict]) -> None:
+            GASSTATION_INFLIGHT.pop(url, None)
+            # Note that `.exception()` also marks the exception as retrieved.
+            if not task.cancelled() and task.exception() is None:
+                # Re-insert to keep the dict in the update order, for dropping the oldest items.
+                GASSTATION_CACHE.pop(url, None)
+                GASSTATION_CACHE[url] = (ts, task.result())
+                while len(GASSTATION_CACHE) > GASSTATION_CACHE_MAX_SIZE:
+                    GASSTATION_CACHE.pop(next(iter(GASSTATION_CACHE)))
+
+        task.add_done_callback(on_done)
+        GASSTATION_INFLIGHT[url] = task
+        return task
 
     async def _request_gasstation(self, url: str, *, cached: bool = True) -> Any:
         if cached and self.gasstation_cache_ttl_sec:
@@ -298,24 +341,22 @@ class W3GasHelper:
             gasPrice=hex(gwei_to_wei(data)),
         )
 
-    async def build_gas_price_base(self) -> TxParamsSimple:
-        # To consider: make gasstation chains exempt from the `_add_extra_gas_price`
-        # (move them to `def build_gas_price`)
-        if self.chain_id == 137:
-            return await self._build_gas_price_polygon()
-
-        if self.chain_id == 1101:
-            return await self._build_gas_price_polygonzkevm()
-
-        if self.chain_id in PRE_EIP1559_CHAIN_IDS:
-            return await _build_gas_price_legacy(req_node=self.req_node)
+    async def _build_gas_price_node_legacy(self) -> TxParamsSimple:
+        return await _build_gas_price_legacy(req_node=self.req_node)
 
+    async def _build_gas_price_node_dynamic(self) -> TxParamsSimple:
         try:
             return await _build_gas_price_dynamic(req_node=self.req_node)
         except MethodUnavailableSimple:
             self.logger.error("Failed to build EIP-1559 gas on chain_id=%r", self.chain_id)
             return await _build_gas_price_legacy(req_node=self.req_node)
 
+    async def build_gas_price_base(self) -> TxParamsSimple:
+        # To consider: make gasstation chains exempt from the `_add_extra_gas_price`
+        # (move them to `def build_gas_price`)
+        builder = GAS_PRICE_BUILDERS.get(self.chain_id, W3GasHelper._build_gas_price_node_dynamic)
+        return await builder(self)
+
     def _add_extra_gas_price_and_units(self, tx_params: TxParamsSimple) -> TxParamsSimple:
         return _add_extra_gas_price_and_units(
             tx_params,
@@ -325,20 +366,29 @@ class W3GasHelper:
         )
 
     async def build_gas_params_pre(self, tx_params: TxParamsSimple) -> TxParamsSimple:
-        # merlin, linea: `from` is required for estimate-gas.
-        if self.chain_id in (4200, 59144) and not tx_params.get("from"):
+        if self.chain_id in FROM_REQUIRED_CHAIN_IDS and not tx_params.get("from"):
             raise GasError({"message": "Tx params need specified `from` for linea and merlin"})
 
         if self.chain_id == 59144:  # linea
             return await _build_gas_params_linea(tx_params, req_node=self.req_node)
 
-        # To consider: request these simultaneously
-        # (which means not passing the gas price params to `eth_estimateGas`)
-        tx_params_gas_price = await self.build_gas_price_base()
-        gas_units_params = await _build_gas_units({**tx_params, **tx_params_gas_price}, req_node=self.req_node)
+        # Requested simultaneously, which means not passing the gas price params to `eth_estimateGas`.
+        tx_params_gas_price, gas_units_params = await aiogather(
+            self.build_gas_price_base(),
+            _build_gas_units(tx_params, req_node=self.req_node),
+        )
         return {**tx_params_gas_price, "gas": gas_units_params.get("gas", "0x0")}
 
     async def build_gas_params(self, tx_params: TxParamsSimple) -> TxParamsSimple:
         pre_result = await self.build_gas_params_pre(tx_params)
         # To consider: skip extra-price in the gasstation chains (polygon, polygonzkevm)
         return self._add_extra_gas_price_and_units(pre_result)
+
+
+# chain_id -> gas price builder; the other chains use the EIP-1559 one (with a fallback to the legacy one).
+GAS_PRICE_BUILDERS: dict[int, Callable[[W3GasHelper], Awaitable[TxParamsSimple]]] = {
+    **dict.fromkeys(PRE_EIP1559_CHAIN_IDS, W3GasHelper._build_gas_price_node_legacy),
+    # gasstation chains
+    137: W3GasHelper._build_gas_price_polygon,
+    1101: W3GasHelper._build_gas_price_polygonzkevm,
+}
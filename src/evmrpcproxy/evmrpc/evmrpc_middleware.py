@@ -1,11 +1,14 @@
 import abc
+import asyncio
+import collections
 import dataclasses
 import functools
 import logging
 from collections.abc import Awaitable, Callable
-from typing import Any, ClassVar
+from typing import Any, ClassVar, NamedTuple, TypeVar
 
 from hyapp.aio import aiogather, aiogather_it
+from hyapp.https import HTTPClient
 
 from .evmrpc_config_model import EVMRPCNodeConfig
 from .evmrpc_gas import (
@@ -18,6 +21,7 @@ from .evmrpc_models import (
     EVMRPCErrorResponseException,
     EVMRPCRequest,
     EVMRPCRequestBatch,
+    EVMRPCRequestParams,
     EVMRPCRequestSingle,
     EVMRPCResponse,
     req_from_singles,
@@ -31,7 +35,6 @@ TEVMRPCHandler = Callable[[EVMRPCRequest], Awaitable[EVMRPCResponse]]
 def _match_batch(resp: EVMRPCResponse, *, req: EVMRPCRequest) -> EVMRPCResponse:
     """Non-batched request should return a non-batched result"""
     if isinstance(req, EVMRPCRequestSingle):
-        assert isinstance(req.data, dict)
         if isinstance(resp.data, dict):
             return resp
         assert isinstance(resp.data, list)
@@ -40,13 +43,15 @@ def _match_batch(resp: EVMRPCResponse, *, req: EVMRPCRequest) -> EVMRPCResponse:
     return resp
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class EVMRPCMiddlewareBase(abc.ABC):
     # Next in the middleware onion
     next_handler: TEVMRPCHandler
     # Handler that skips all further middlewares.
     straight_handler: TEVMRPCHandler
     all_nodes: list[EVMRPCNodeConfig]
+    # The EVMRPC client's HTTP client, e.g. for sharing the connection pool.
+    http_cli: HTTPClient
     logger: logging.Logger
 
     @property
@@ -57,14 +62,18 @@ class EVMRPCMiddlewareBase(abc.ABC):
     async def handle(self, req: EVMRPCRequest) -> EVMRPCResponse:
         raise NotImplementedError
 
+    async def aclose(self) -> None:
+        """Finish any background work, called before the EVMRPC client's session is closed"""
+        return
 
-@dataclasses.dataclass(frozen=True)
+
+@dataclasses.dataclass(frozen=True, slots=True)
 class EVMRPCMiddlewareNoop(EVMRPCMiddlewareBase):
     async def handle(self, req: EVMRPCRequest) -> EVMRPCResponse:
         return await self.next_handler(req)
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class EVMRPCSingleRequestPreprocessorMiddlewareBase(EVMRPCMiddlewareBase):
     @abc.abstractmethod
     async def process_single_req(self, req: EVMRPCRequestSingle) -> EVMRPCRequestSingle:
@@ -77,8 +86,8 @@ class EVMRPCSingleRequestPreprocessorMiddlewareBase(EVMRPCMiddlewareBase):
         return await self.next_handler(req_mangled)
 
 
-@dataclasses.dataclass(frozen=True)
-class EVMRPCMangleGetlogsMiddleware(EVMRPCSingleRequestPreprocessorMiddlewareBase):
+@dataclasses.dataclass(frozen=True, slots=True)
+class EVMRPCMangleGetlogsMiddleware(EVMRPCMiddlewareBase):
     def _mangle_eth_getlogs(self, req_data: dict, *, max_blocks_distance: int) -> dict:
         try:
             params = req_data["params"][0]
@@ -88,15 +97,14 @@ class EVMRPCMangleGetlogsMiddleware(EVMRPCSingleRequestPreprocessorMiddlewareBas
             self.logger.exception("Error in EVMRPCMangleGetlogsMiddleware params")
             return req_data
 
-        to_block: int | None = None
         try:
             from_block = int(from_block_hex, 16)
             to_block = int(to_block_hex, 16)
         except ValueError:
             self.logger.error(
                 "Non-hex blocks in EVMRPCMangleGetlogsMiddleware params: from_block=%r, to_block=%r",
-                from_block,
-                to_block,
+                from_block_hex,
+                to_block_hex,
             )
             return req_data
 
@@ -115,35 +123,66 @@ class EVMRPCMangleGetlogsMiddleware(EVMRPCSingleRequestPreprocessorMiddlewareBas
             return {**req_data, "params": [{**params, "fromBlock": new_from_block_hex}]}
         return req_data
 
-    async def process_single_req(self, req: EVMRPCRequestSingle) -> EVMRPCRequestSingle:
-        if (
-            req.req_params.allow_getlogs_mangle
-            and req.node_config.max_blocks_distance
-            and req.data.get("method") == "eth_getLogs"
-        ):
-            req_data = self._mangle_eth_getlogs(req.data, max_blocks_distance=req.node_config.max_blocks_distance)
-            return req.replace(data=req_data)
-        return req
+    def _mangle_item(self, req_data: dict, *, max_blocks_distance: int) -> dict:
+        if req_data.get("method") == "eth_getLogs":
+            return self._mangle_eth_getlogs(req_data, max_blocks_distance=max_blocks_distance)
+        return req_data
 
+    async def handle(self, req: EVMRPCRequest) -> EVMRPCResponse:
+        # Working on the data directly, rather than on the per-item requests.
+        max_blocks_distance = req.node_config.max_blocks_distance
+        if not (req.req_params.allow_getlogs_mangle and max_blocks_distance):
+            return await self.next_handler(req)
 
-@dataclasses.dataclass(frozen=True)
+        if isinstance(req, EVMRPCRequestSingle):
+            req_data = self._mangle_item(req.data, max_blocks_distance=max_blocks_distance)
+            if req_data is not req.data:
+                req = req.replace(data=req_data)
+            return await self.next_handler(req)
+
+        items = [self._mangle_item(item, max_blocks_distance=max_blocks_distance) for item in req.data]
+        # Only copy the request if something was actually mangled.
+        if any(item is not orig_item for item, orig_item in zip(items, req.data)):
+            req = req.replace(data=items)
+        return await self.next_handler(req)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
 class EVMRPCUnbatchMiddleware(EVMRPCMiddlewareBase):
+    # Shared between the concurrent requests to each node (of the chain).
+    _node_semaphores: dict[str, asyncio.Semaphore] = dataclasses.field(default_factory=dict, init=False, repr=False)
+
+    def _get_node_semaphore(self, node_config: EVMRPCNodeConfig) -> asyncio.Semaphore:
+        semaphore = self._node_semaphores.get(node_config.node_name)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(node_config.unbatch_max_concurrency)
+            self._node_semaphores[node_config.node_name] = semaphore
+        return semaphore
+
+    async def _handle_limited(self, req: EVMRPCRequest, semaphore: asyncio.Semaphore) -> EVMRPCResponse:
+        async with semaphore:
+            return await self.next_handler(req)
+
     async def handle(self, req: EVMRPCRequest) -> EVMRPCResponse:
         if not req.node_config.supports_batch and isinstance(req, EVMRPCRequestBatch):
-            assert isinstance(req.data, list)
+            semaphore = self._get_node_semaphore(req.node_config)
             reqs = req_to_singles(req)
-            resps = await aiogather_it(self.next_handler(req) for req in reqs)
+            resps = await aiogather_it(self._handle_limited(req, semaphore) for req in reqs)
             return EVMRPCResponse(data=[resp.data for resp in resps], req=req)
 
         return await self.next_handler(req)
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class EVMRPCSingleRequestHandlerMiddlewareBase(EVMRPCMiddlewareBase):
     @abc.abstractmethod
-    def is_req_relevant(self, req: EVMRPCRequestSingle) -> bool:
+    def is_item_relevant(self, req_data: dict[str, Any], req_params: EVMRPCRequestParams) -> bool:
+        """Same as `is_req_relevant`, without having to wrap the batch items into requests"""
         raise NotImplementedError
 
+    def is_req_relevant(self, req: EVMRPCRequestSingle) -> bool:
+        return self.is_item_relevant(req.data, req.req_params)
+
     @abc.abstractmethod
     async def handle_single_req(self, req: EVMRPCRequestSingle) -> EVMRPCResponse:
         raise NotImplementedError
@@ -172,22 +211,30 @@ class EVMRPCSingleRequestHandlerMiddlewareBase(EVMRPCMiddlewareBase):
         return EVMRPCResponse(data=[resp.data for resp in resps], req=top_req)
 
     async def handle(self, req: EVMRPCRequest) -> EVMRPCResponse:
+        if isinstance(req, EVMRPCRequestSingle):
+            if not self.is_req_relevant(req):
+                return await self.next_handler(req)
+            resp = await self.handle_single_req(req)
+            # Same as in `_handle_relevant`.
+            return resp.replace(req=req)
+
+        if not any(self.is_item_relevant(item, req.req_params) for item in req.data):
+            # Straight pass-through (the most common case).
+            return await self.next_handler(req)
+
         reqs = req_to_singles(req)
         reqs_normal, reqs_relevant_with_idx = pick_out_special_items(reqs, is_special=self.is_req_relevant)
 
-        if not reqs_relevant_with_idx:
-            # Straight pass-through.
-            return await self.next_handler(req)
-
         reqs_relevant = [req for _, req in reqs_relevant_with_idx]
         if not reqs_normal:
             resp_relevant = await self._handle_relevant(reqs_relevant, top_req=req)
             # Non-batched request should return a non-batched result.
             return _match_batch(resp_relevant, req=req)
 
-        resp_normal, resp_relevant = await aiogather(
+        # A single flat gather (rather than gathering the `_handle_relevant` gather).
+        resp_normal, *resps_relevant = await aiogather(
             self._handle_normal(reqs_normal, top_req=req),
-            self._handle_relevant(reqs_relevant, top_req=req),
+            *(self.handle_single_req(req_relevant) for req_relevant in reqs_relevant),
         )
 
         if not isinstance(resp_normal.data, list):
@@ -198,8 +245,7 @@ class EVMRPCSingleRequestHandlerMiddlewareBase(EVMRPCMiddlewareBase):
             return resp_normal
 
         data_normal = resp_normal.data
-        data_relevant = resp_relevant.data
-        assert isinstance(data_relevant, list)
+        data_relevant = [resp.data for resp in resps_relevant]
         assert len(data_relevant) == len(reqs_relevant_with_idx)
         data_relevant_with_idx = [(idx, resp) for (idx, _), resp in zip(reqs_relevant_with_idx, data_relevant)]
 
@@ -207,37 +253,221 @@ class EVMRPCSingleRequestHandlerMiddlewareBase(EVMRPCMiddlewareBase):
         return resp_normal.replace(data=data_full)
 
 
+@functools.lru_cache(maxsize=1024)
+def _chain_id_hex(chain_id: int) -> str:
+    return hex(chain_id)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
 class EVMRPCChainIdMiddleware(EVMRPCSingleRequestHandlerMiddlewareBase):
-    def is_req_relevant(self, req: EVMRPCRequestSingle) -> bool:
-        return req.data.get("method") == "eth_chainId" and req.req_params.chain_id is not None
+    def is_item_relevant(self, req_data: dict[str, Any], req_params: EVMRPCRequestParams) -> bool:
+        return req_data.get("method") == "eth_chainId" and req_params.chain_id is not None
 
     async def handle_single_req(self, req: EVMRPCRequestSingle) -> EVMRPCResponse:
-        assert self.is_req_relevant(req)
         chain_id = req.req_params.chain_id
         assert chain_id is not None
-        return EVMRPCResponse.from_single_req(req=req, result=hex(chain_id))
+        return EVMRPCResponse.from_single_req(req=req, result=_chain_id_hex(chain_id))
 
 
-def _pick_unknown_method_errors(data: Any) -> list[Any] | None:
-    if not isinstance(data, list):
-        return None
-    errors = [item.get("error") for item in data if isinstance(item, dict) and item.get("error")]
-    return [item for item in errors if isinstance(item, dict) and item.get("code") in (32601, -32601)]
+_UNKNOWN_METHOD_CODES = frozenset((32601, -32601))
+
+
+def _pick_errors(data: list[Any]) -> list[Any]:
+    return [error for item in data if isinstance(item, dict) and (error := item.get("error"))]
 
 
+def _pick_unknown_method_errors(errors: list[Any]) -> list[Any]:
+    return [error for error in errors if isinstance(error, dict) and error.get("code") in _UNKNOWN_METHOD_CODES]
+
+
+# (node_name, req_params, try_n)
+TGasBatchKey = tuple[str, EVMRPCRequestParams, int]
+TCounterKey = TypeVar("TCounterKey")
+TGasBatchSend = Callable[[list, EVMRPCRequest], Awaitable[list]]
+
+
+def _counter_decrement(counter: collections.Counter[TCounterKey], key: TCounterKey) -> None:
+    """Decrement, without leaving the zero counts behind"""
+    count = counter[key] - 1
+    if count > 0:
+        counter[key] = count
+    else:
+        del counter[key]
+
+
+class _GasBatchWaiter(NamedTuple):
+    future: asyncio.Future[list]
+    start: int
+    end: int
+
+
+@dataclasses.dataclass()
+class _PendingGasBatch:
+    top_req: EVMRPCRequest
+    send: TGasBatchSend
+    flush_handle: asyncio.TimerHandle | None = None
+    items: list = dataclasses.field(default_factory=list)
+    waiters: list[_GasBatchWaiter] = dataclasses.field(default_factory=list)
+
+
+def _order_by_id(data: Any, count: int) -> list | None:
+    """Batch response items in the order of their (`1..count`) ids, `None` if the ids don't match up"""
+    if not isinstance(data, list) or len(data) != count:
+        return None
+    result: list = [None] * count
+    for item in data:
+        item_id = item.get("id") if isinstance(item, dict) else None
+        if type(item_id) is not int or not 1 <= item_id <= count or result[item_id - 1] is not None:
+            return None
+        result[item_id - 1] = item
+    return result
+
+
+@dataclasses.dataclass()
+class _GasBatcher:
+    """
+    Coalesces the concurrent gas-related upstream requests (to the same node) into a single batch,
+    for the nodes with `coalesce_gas_requests` (and `supports_batch`); the others are sent straight.
+
+    A request is sent immediately if nothing from other callers (top-level requests) is in flight for the node
+    (so e.g. the concurrent gas price and gas units requests of a single `ext_estimateGas` don't wait);
+    the others wait for up to `max_wait_sec` (or `max_items`) for a shared batch,
+    which saves upstream requests at the cost of that wait.
+
+    `send` must return the response items in the same order as the request items.
+    """
+
+    max_wait_sec: float = 0.005
+    max_items: int = 50
+
+    _in_flight: collections.Counter[TGasBatchKey] = dataclasses.field(default_factory=collections.Counter)
+    # The part of `_in_flight` sent directly for each caller.
+    _in_flight_own: collections.Counter[tuple[TGasBatchKey, object]] = dataclasses.field(
+        default_factory=collections.Counter
+    )
+    _pending: dict[TGasBatchKey, _PendingGasBatch] = dataclasses.field(default_factory=dict)
+    _tasks: set[asyncio.Task[None]] = dataclasses.field(default_factory=set)
+
+    async def request(self, items: list, *, top_req: EVMRPCRequest, caller: object, send: TGasBatchSend) -> list:
+        """
+        Returns the response items for `items` (sliced out of the shared batch response).
+
+        `caller` is a token of the top-level request, the same for all of its requests.
+        """
+        node_config = top_req.node_config
+        if not node_config.coalesce_gas_requests or not node_config.supports_batch or len(items) >= self.max_items:
+            # Without `supports_batch`, the batch would be split again further down the onion.
+            return await send(items, top_req)
+
+        key = (node_config.node_name, top_req.req_params, top_req.try_n)
+        own_key = (key, caller)
+        pending = self._pending.get(key)
+        if pending is None and self._in_flight[key] == self._in_flight_own[own_key]:
+            self._in_flight_own[own_key] += 1
+            try:
+                return await self._send(key, items, top_req, send)
+            finally:
+                _counter_decrement(self._in_flight_own, own_key)
+
+        if pending is not None and len(pending.items) + len(items) > self.max_items:
+            self._flush(key)
+            pending = None
+
+        loop = asyncio.get_running_loop()
+        if pending is None:
+            pending = self._pending[key] = _PendingGasBatch(top_req=top_req, send=send)
+            pending.flush_handle = loop.call_later(self.max_wait_sec, self._flush, key)
+
+        start = len(pending.items)
+        pending.items.extend(items)
+        waiter = _GasBatchWaiter(future=loop.create_future(), start=start, end=len(pending.items))
+        pending.waiters.append(waiter)
+        if len(pending.items) >= self.max_items:
+            self._flush(key)
+        return await waiter.future
+
+    async def aclose(self) -> None:
+        """Send the pending batches, and wait for all of them to finish"""
+        for key in list(self._pending):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _send(self, key: TGasBatchKey, items: list, top_req: EVMRPCRequest, send: TGasBatchSend) -> list:
+        self._in_flight[key] += 1
+        try:
+            return await send(items, top_req)
+        finally:
+            _counter_decrement(self._in_flight, key)
+
+    def _flush(self, key: TGasBatchKey) -> None:
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        if pending.flush_handle is not None:
+            pending.flush_handle.cancel()
+        task = asyncio.create_task(self._send_pending(key, pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_pending(self, key: TGasBatchKey, pending: _PendingGasBatch) -> None:
+        waiters = pending.waiters
+        try:
+            results = await self._send(key, pending.items, pending.top_req, pending.send)
+        except EVMRPCErrorResponseException as exc:
+            # Only fail the waiters with errors in their own items.
+            data = exc.last_response.data
+            data_ok = isinstance(data, list) and len(data) == len(pending.items)
+            for waiter in waiters:
+                if waiter.future.done():
+                    continue
+                if not data_ok:
+                    waiter.future.set_exception(exc)
+                    continue
+                waiter_items = data[waiter.start : waiter.end]
+                if _pick_errors(waiter_items):
+                    waiter_resp = exc.last_response.replace(data=waiter_items)
+                    waiter.future.set_exception(exc.replace(last_response=waiter_resp))
+                else:
+                    waiter.future.set_result(waiter_items)
+        except Exception as exc:
+            for waiter in waiters:
+                if not waiter.future.done():
+                    waiter.future.set_exception(exc)
+        else:
+            for waiter in waiters:
+                if not waiter.future.done():
+                    waiter.future.set_result(results[waiter.start : waiter.end])
+        finally:
+            # e.g. cancelled on shutdown.
+            for waiter in waiters:
+                waiter.future.cancel()
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
 class EVMRPCExtGasMiddleware(EVMRPCSingleRequestHandlerMiddlewareBase):
     RPC_METHOD_NAME: ClassVar[str] = "ext_estimateGas"
 
-    def is_req_relevant(self, req: EVMRPCRequestSingle) -> bool:
-        return req.data.get("method") == self.RPC_METHOD_NAME
+    _gas_batcher: _GasBatcher = dataclasses.field(default_factory=_GasBatcher, init=False, repr=False)
+
+    def _make_gasstation_http_cli(self) -> HTTPClient:
+        """
+        Same connection pool (if the EVMRPC client is entered), but with the default (retrying) options.
+
+        Made per request, as the (cached) middlewares outlive the EVMRPC client's session.
+        """
+        return HTTPClient(session=self.http_cli.session)
+
+    def is_item_relevant(self, req_data: dict[str, Any], req_params: EVMRPCRequestParams) -> bool:
+        return req_data.get("method") == self.RPC_METHOD_NAME
 
     async def _handle_fallback(self, req: EVMRPCRequestSingle) -> EVMRPCResponse:
-        assert self.is_req_relevant(req)
         req_mangled = req.replace(data={**req.data, "method": "eth_estimateGas"})
         # This would lose on the batching, but this shouldn't normally happen anyway.
         return await self.next_handler(req_mangled)
 
-    async def _req_node(self, reqs: list, *, top_req: EVMRPCRequest) -> list:
+    async def _req_node_batch(self, reqs: list, top_req: EVMRPCRequest) -> list:
+        """Upstream request for the (possibly coalesced) `reqs`, returning the response items in the same order"""
         reqs_processed = [{"jsonrpc": "2.0", "id": idx + 1, **req} for idx, req in enumerate(reqs)]
 
         req = EVMRPCRequestBatch(
@@ -246,28 +476,45 @@ class EVMRPCExtGasMiddleware(EVMRPCSingleRequestHandlerMiddlewareBase):
             req_params=top_req.req_params,
             try_n=top_req.try_n,
         )
+        # Batch responses are allowed to be in any order, so match them by the ids
+        # (which matters for splitting the coalesced batches between the callers).
         try:
             # To consider: alter the req to force turn-on the `do_upstream_debug`.
             resp = await self.next_handler(req)
         except EVMRPCErrorResponseException as exc:
-            unknown_method_errors = _pick_unknown_method_errors(exc.last_response.data)
-            if unknown_method_errors:
-                raise MethodUnavailableSimple(unknown_method_errors) from exc
-            raise
+            error_items = _order_by_id(exc.last_response.data, len(reqs))
+            if error_items is None:
+                raise
+            raise exc.replace(last_response=exc.last_response.replace(data=error_items)) from exc
 
-        if not isinstance(resp.data, list) or len(resp.data) != len(reqs):
+        resp_items = _order_by_id(resp.data, len(reqs))
+        if resp_items is None:
             raise GasError({"message": "Upstream error", "x_reqs": reqs, "x_resp": resp.data})
+        return resp_items
 
-        # To consider: reorder `resp.data` by `id` values
+    async def aclose(self) -> None:
+        await self._gas_batcher.aclose()
 
-        unknown_method_errors = _pick_unknown_method_errors(resp.data)
-        if unknown_method_errors:
-            raise MethodUnavailableSimple(unknown_method_errors)
+    async def _req_node(self, reqs: list, *, top_req: EVMRPCRequest, caller: object) -> list:
+        try:
+            resp_items = await self._gas_batcher.request(
+                reqs, top_req=top_req, caller=caller, send=self._req_node_batch
+            )
+        except EVMRPCErrorResponseException as exc:
+            last_data = exc.last_response.data
+            errors = _pick_errors(last_data) if isinstance(last_data, list) else []
+            unknown_method_errors = _pick_unknown_method_errors(errors)
+            if unknown_method_errors:
+                raise MethodUnavailableSimple(unknown_method_errors) from exc
+            raise
 
-        errors = [item.get("error") for item in resp.data if isinstance(item, dict) and item.get("error")]
+        errors = _pick_errors(resp_items)
         if errors:
+            unknown_method_errors = _pick_unknown_method_errors(errors)
+            if unknown_method_errors:
+                raise MethodUnavailableSimple(unknown_method_errors)
             raise GasError(errors[0])
-        return [item.get("result") for item in resp.data]
+        return [item.get("result") for item in resp_items]
 
     async def _handle_gas(self, chain_id: int, req_data: dict, *, top_req: EVMRPCRequest) -> dict:
         params = req_data.get("params")
@@ -286,7 +533,9 @@ class EVMRPCExtGasMiddleware(EVMRPCSingleRequestHandlerMiddlewareBase):
 
         helper = W3GasHelper(
             chain_id=chain_id,
-            req_node=functools.partial(self._req_node, top_req=top_req),
+            # A new token for the batcher, to tell this request's node requests apart from the others'.
+            req_node=functools.partial(self._req_node, top_req=top_req, caller=object()),
+            http_cli=self._make_gasstation_http_cli(),
             gasstation_key=gasstation_key,
             gas_price_extra_pct=gas_price_extra_pct,
             gas_priority_fee_extra_pct=gas_priority_fee_extra_pct,
@@ -304,14 +553,12 @@ class EVMRPCExtGasMiddleware(EVMRPCSingleRequestHandlerMiddlewareBase):
         return exc
 
     async def handle_single_req(self, req: EVMRPCRequestSingle) -> EVMRPCResponse:
-        assert self.is_req_relevant(req)
         chain_id = req.req_params.chain_id
         if chain_id is None:
             self.logger.error("No chain id specified for %r", req.node_config.chain_name)
             return await self._handle_fallback(req)
 
         try:
-            assert isinstance(req.data, dict)
             result = await self._handle_gas(chain_id, req.data, top_req=req)
             return EVMRPCResponse.from_single_req(req=req, result=result)
         except GasError as exc:
@@ -1,4 +1,5 @@
 import dataclasses
+import operator
 from typing import Any, NamedTuple, Protocol, Self
 
 from .evmrpc_config_model import EVMRPCNodeConfig
@@ -10,7 +11,7 @@ class NoNodesAvailable(KeyError):
     """Raised when a chain with no viable nodes is requested"""
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class EVMRPCRequestParams:
     allow_getlogs_mangle: bool = False
     # A static `chain_id` to avoid unnecessary `eth_chainId` requests.
@@ -18,7 +19,10 @@ class EVMRPCRequestParams:
     chain_id: int | None = None
 
 
-@dataclasses.dataclass(frozen=True)
+DEFAULT_REQUEST_PARAMS = EVMRPCRequestParams()
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
 class EVMRPCRequestBase:
     data: dict | list
     node_config: EVMRPCNodeConfig
@@ -31,25 +35,28 @@ class EVMRPCRequestBase:
         return dataclasses.replace(self, **kwargs)
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class EVMRPCRequestSingle(EVMRPCRequestBase):
     data: dict[str, Any]
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class EVMRPCRequestBatch(EVMRPCRequestBase):
     data: list[dict[str, Any]]
 
 
 EVMRPCRequest = EVMRPCRequestSingle | EVMRPCRequestBatch
 
+# All the request fields except for `data` (as a tuple), for checking that the requests can be combined.
+_get_req_meta = operator.attrgetter(
+    *(field.name for field in dataclasses.fields(EVMRPCRequestBase) if field.name != "data")
+)
+
 
 def req_to_singles(req: EVMRPCRequest) -> list[EVMRPCRequestSingle]:
     if isinstance(req, EVMRPCRequestSingle):
-        assert isinstance(req.data, dict)
         return [req]
 
-    assert isinstance(req.data, list)
     return [
         EVMRPCRequestSingle(data=subreq, node_config=req.node_config, req_params=req.req_params, try_n=req.try_n)
         for subreq in req.data
@@ -62,20 +69,17 @@ def req_from_singles(reqs: list[EVMRPCRequestSingle], *, req_to_match: EVMRPCReq
 
     if len(reqs) == 1:
         req = reqs[0]
-        assert isinstance(req, EVMRPCRequestSingle)
-        assert isinstance(req.data, dict)
 
         if req_to_match is None or isinstance(req_to_match, EVMRPCRequestSingle):
             return req
 
         # Otherwise, req_to_match is a batch
-        assert isinstance(req_to_match, EVMRPCRequestBatch)
-        assert isinstance(req_to_match.data, list)
         assert len(req_to_match.data) == 1
         return req.replace(data=[req.data])
 
-    ref_req = reqs[0].replace(data=None)
-    misplaced = [req for req in reqs if req.replace(data=None) != ref_req]
+    ref_req = reqs[0]
+    ref_meta = _get_req_meta(ref_req)
+    misplaced = [req for req in reqs if _get_req_meta(req) != ref_meta]
     if misplaced:
         raise ValueError("Mismatch in single-requests", misplaced)
 
@@ -93,7 +97,6 @@ class EVMRPCResponse(NamedTuple):
 
     @classmethod
     def from_single_req(cls, req: EVMRPCRequestSingle, result: Any) -> Self:
-        assert isinstance(req.data, dict)
         resp_data = {
             "jsonrpc": req.data.get("jsonrpc") or "2.0",
             "id": req.data.get("id"),
@@ -103,12 +106,12 @@ class EVMRPCResponse(NamedTuple):
 
     @property
     def has_errors(self) -> bool:
-        try:
-            if isinstance(self.data, dict):
-                return "error" in self.data
-            return any("error" in item for item in self.data)
-        except Exception:
-            return False
+        data = self.data
+        if isinstance(data, dict):
+            return "error" in data
+        if isinstance(data, list):
+            return any(isinstance(item, dict) and "error" in item for item in data)
+        return False
 
     def replace(self, **kwargs: Any) -> Self:
         return self._replace(**kwargs)
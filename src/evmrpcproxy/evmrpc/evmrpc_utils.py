@@ -1,4 +1,4 @@
-from collections.abc import Collection, Sequence
+from collections.abc import Collection
 
 EVMRPC_NONRETRIABLE_CODES_RAW: Collection[int] = (
     # "execution reverted",
@@ -23,7 +23,8 @@ EVMRPC_NONRETRIABLE_MESSAGES_RAW: Collection[str] = (
     "RPC error response: RPC error response: INTERNAL_ERROR: nonce too low",
 )
 EVMRPC_NONRETRIABLE_MESSAGES = frozenset(EVMRPC_NONRETRIABLE_MESSAGES_RAW)
-EVMRPC_NONRETRIABLE_MESSAGE_PREFIXES: Sequence[str] = (
+# A tuple, for `str.startswith`.
+EVMRPC_NONRETRIABLE_MESSAGE_PREFIXES: tuple[str, ...] = (
     # code: -32000, seen on `b2` `bsquared_public`
     "nonce too low: ",
     # code: -32000, seen on `bouncebit`
@@ -33,11 +34,16 @@ EVMRPC_NONRETRIABLE_MESSAGE_PREFIXES: Sequence[str] = (
 
 
 def is_evmrpc_error_response_retriable(code: int, message: str) -> bool:
-    if code in EVMRPC_NONRETRIABLE_CODES:
-        return False
-    if message in EVMRPC_NONRETRIABLE_MESSAGES:
-        return False
-    if any(message.startswith(prefix) for prefix in EVMRPC_NONRETRIABLE_MESSAGE_PREFIXES):  # noqa: SIM103
-        return False
-
-    return True
+    """
+    >>> is_evmrpc_error_response_retriable(3, "execution reverted")
+    False
+    >>> is_evmrpc_error_response_retriable(-32000, "nonce too low: next nonce 5, tx nonce 4")
+    False
+    >>> is_evmrpc_error_response_retriable(-32000, "header not found")
+    True
+    """
+    return not (
+        code in EVMRPC_NONRETRIABLE_CODES
+        or message in EVMRPC_NONRETRIABLE_MESSAGES
+        or message.startswith(EVMRPC_NONRETRIABLE_MESSAGE_PREFIXES)
+    )
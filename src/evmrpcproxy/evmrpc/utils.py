@@ -2,6 +2,10 @@ from collections.abc import Callable, Sequence
 from typing import Any, TypeVar
 
 import orjson
+import yaml
+
+# The LibYAML-based loader is much faster, but might be unavailable.
+YAML_SAFE_LOADER: type[yaml.SafeLoader] = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 
 def json_dumps(value: Any) -> str:
@@ -10,23 +14,91 @@ def json_dumps(value: Any) -> str:
     return orjson.dumps(value).decode()
 
 
+def yaml_safe_load(value: str | bytes) -> Any:
+    return yaml.load(value, Loader=YAML_SAFE_LOADER)
+
+
+def _dump_list_ends(data: list, min_head_len: int, min_tail_len: int) -> tuple[bytes, bytes | None]:
+    """
+    Serialize only as many items from each end of `data` as needed for the head and tail of the dump.
+
+    Returns `(full_dump, None)` if all of the items ended up serialized anyway,
+    and `(head, tail)` otherwise (with at least one item skipped between those).
+
+    >>> _dump_list_ends([1, 22, 333, 4444], min_head_len=3, min_tail_len=3)
+    (b'[1,', b',4444]')
+    >>> _dump_list_ends([1, 22], min_head_len=3, min_tail_len=3)
+    (b'[1,22]', None)
+    """
+    head_parts: list[bytes] = []
+    head_len = 1  # "["
+    head_end = 0
+    while head_len < min_head_len and head_end < len(data):
+        part = orjson.dumps(data[head_end])
+        head_parts.append(part)
+        head_len += len(part) + 1  # the following ","
+        head_end += 1
+
+    tail_parts: list[bytes] = []
+    tail_len = 1  # "]"
+    tail_start = len(data)
+    while tail_len < min_tail_len and tail_start > head_end:
+        tail_start -= 1
+        part = orjson.dumps(data[tail_start])
+        tail_parts.append(part)
+        tail_len += len(part) + 1  # the preceding ","
+
+    tail_parts.reverse()
+    if tail_start == head_end:
+        return b"".join((b"[", b",".join([*head_parts, *tail_parts]), b"]")), None
+    return b"".join((b"[", b",".join(head_parts), b",")), b"".join((b",", b",".join(tail_parts), b"]"))
+
+
 def dumpcut(data: Any, max_length: int, full_key: str, cut_key: str, cut_sep: str = "…") -> dict[str, Any]:
     """
     Shortcut for logging some JSONable data with limited length and a distinct key for the cut values.
 
+    The lengths are in (UTF-8) bytes of the dump,
+    and large lists are only serialized as much as needed for the cut value.
+
     >>> dumpcut({"value": "short"}, max_length=20, full_key="fk", cut_key="ck")
     {'fk': {'value': 'short'}}
     >>> dumpcut({"value": "long" * 10}, max_length=20, full_key="fk", cut_key="ck")
     {'ck': '{"value":"…onglong"}'}
+    >>> dumpcut(list(range(100, 1000)), max_length=20, full_key="fk", cut_key="ck")
+    {'ck': '[100,101,1…,998,999]'}
+    >>> dumpcut([760, 1, 189], max_length=11, full_key="fk", cut_key="ck")
+    {'fk': [760, 1, 189]}
+    >>> dumpcut([760, 10, 189], max_length=11, full_key="fk", cut_key="ck")
+    {'ck': '[760,…189]'}
     """
     assert len(cut_sep) < max_length // 2
-    data_s = json_dumps(data)
-    if len(data_s) <= max_length:
-        return {full_key: data}
     half_len = max_length // 2
     right_len = half_len - len(cut_sep)
     assert right_len > 0
-    data_cut = "".join((data_s[:half_len], cut_sep, data_s[-right_len:]))
+
+    head: bytes
+    tail: bytes | None = None
+    if isinstance(data, list) and right_len > 1:
+        # Guarantee that the skipped middle makes the full dump longer than `max_length`
+        # (`head + tail >= max_length`, plus at least one byte of the skipped items).
+        head, tail = _dump_list_ends(data, min_head_len=half_len, min_tail_len=max_length - half_len)
+    else:
+        head = orjson.dumps(data)
+
+    if tail is None:
+        if len(head) <= max_length:
+            return {full_key: data}
+        tail = head
+
+    # Cutting the bytes might split a multibyte character, which is fine for logging purposes.
+    data_cut = "".join(
+        (
+            head[:half_len].decode(errors="ignore"),
+            cut_sep,
+            tail[-right_len:].decode(errors="ignore"),
+        )
+    )
     return {cut_key: data_cut}
 
 
@@ -52,6 +124,8 @@ def put_in_special_results(
     """
     Inverse of `pick_out_special_items`.
 
+    `special_results` should be in the ascending `idx` order (as is the `pick_out_special_items` output).
+
     >>> items = ["aa", "xbb", "cc", "xdd"]
     >>> normal_items, special_items = pick_out_special_items(items, is_special=lambda item: item.startswith("x"))
     >>> normal_items_res = [f"res_{item}" for item in normal_items]
@@ -60,7 +134,14 @@ def put_in_special_results(
     >>> result
     ['res_aa', 'xres_xbb', 'res_cc', 'xres_xdd']
     """
-    result = list(normal_results)
+    result: list[TItem] = []
+    normal_pos = 0
     for idx, item_res in special_results:
-        result.insert(idx, item_res)
+        # Fill in the normal items up to the special item's position.
+        normal_count = idx - len(result)
+        if normal_count > 0:
+            result.extend(normal_results[normal_pos : normal_pos + normal_count])
+            normal_pos += normal_count
+        result.append(item_res)
+    result.extend(normal_results[normal_pos:])
     return result
@@ -1,7 +1,7 @@
 import hyapp.logs as hyapp_logs
 import sentry_sdk
 
-from .settings import Settings
+from .settings import Settings, get_settings
 
 INIT_STATE: dict[str, Settings] = {}
 
@@ -24,7 +24,7 @@ def init_logs(settings: Settings) -> None:
 
 def init_all(settings: Settings | None = None) -> None:
     if settings is None:
-        settings = Settings()
+        settings = get_settings()
 
     # Allow for re-calling.
     # Needed to ensure initialization when under e.g. gunicorn.
@@ -1,3 +1,4 @@
+import functools
 import hashlib
 import os
 from pathlib import Path
@@ -30,9 +31,13 @@ class SettingsOptsBase(pydantic_settings.BaseSettings):
         frozen=True,
     )
 
+    @functools.cached_property
+    def settings_hash(self) -> str:
+        """Short hash of all the values, for `__repr__` (cached, since the settings are frozen)"""
+        return hashlib.sha256(self.model_dump_json().encode()).hexdigest()[:16]
+
     def __repr__(self) -> str:
-        hash_str = hashlib.sha256(self.model_dump_json().encode()).hexdigest()[:16]
-        return f"{self.__class__.__name__}(env={self.env}, hash={hash_str}, ...)"
+        return f"{self.__class__.__name__}(env={self.env}, hash={self.settings_hash}, ...)"
 
     def __str__(self) -> str:
         return self.__repr__()
@@ -54,6 +59,7 @@ class SettingsOptsBase(pydantic_settings.BaseSettings):
 
     api_bind: str = "0.0.0.0"
     api_port: int = 13431
+    # Explicit, as the container CPU limits are not visible in the `os.cpu_count()`.
     api_deploy_workers: int = 4
     api_dev_reload: bool = True
 
@@ -93,3 +99,9 @@ class SettingsOptsEnv(SettingsOptsBase):
 
 class Settings(pydantic.BaseModel):
     opts: SettingsOptsBase = pydantic.Field(default_factory=SettingsOptsEnv)
+
+
+@functools.cache
+def get_settings() -> Settings:
+    """Process-wide settings from the environment, parsed once"""
+    return Settings()
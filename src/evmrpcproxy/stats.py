@@ -1,9 +1,11 @@
 import asyncio
+import contextlib
 import dataclasses
 import datetime
+import gzip
 import logging
 import time
-from collections.abc import Sequence
+from collections.abc import AsyncGenerator, Sequence
 from typing import Any, Generic, NamedTuple, Self, TypeVar
 
 import orjson
@@ -55,6 +57,9 @@ class CHClient:
     ch_table_column_names: Sequence[str]
     ch_url: str = dataclasses.field(repr=False)
     http_cli: HTTPClient = dataclasses.field(repr=False)
+    # The stats rows are very repetitive, so even a low level compresses them well.
+    # `None` to send the body uncompressed.
+    gzip_level: int | None = 3
 
     @staticmethod
     def _ch_qi(name: str) -> str:
@@ -65,61 +70,130 @@ class CHClient:
 
     @staticmethod
     def serialize_ndjson(data: list[Any]) -> bytes:
-        return b"".join(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in data)
+        # Note: dumping the whole list and splitting it on `],[` would be faster,
+        # but not safe for the (user-provided) string values.
+        if not data:
+            return b""
+        return b"\n".join(map(orjson.dumps, data)) + b"\n"
 
     def __post_init__(self) -> None:
         cols_sql = ", ".join(self._ch_qi(col) for col in self.ch_table_column_names)
         self.insert_query = f"insert into {self._ch_qi(self.ch_table_name)} ({cols_sql}) format JSONCompactEachRow"
+        # Same for all the uploads (and not mutated by the `HTTPClient`).
+        self.upload_params = {"query": self.insert_query}
+        # Decompressed by ClickHouse according to the `Content-Encoding`.
+        self.upload_headers = {"Content-Encoding": "gzip"} if self.gzip_level is not None else {}
 
-    async def upload(self, data_rows: list[tuple[Any, ...]]) -> None:
-        params = {"query": self.insert_query}
-        headers: dict[str, str] = {}
+    def build_body(self, data_rows: list[tuple[Any, ...]]) -> bytes:
         body = self.serialize_ndjson(data_rows)
-        await self.http_cli.req(self.ch_url, method="post", params=params, headers=headers, data=body)
+        if self.gzip_level is not None:
+            body = gzip.compress(body, compresslevel=self.gzip_level)
+        return body
+
+    async def upload(self, data_rows: list[tuple[Any, ...]]) -> None:
+        # Serializing / compressing a large batch can take a while, so keep it off the event loop.
+        body = await asyncio.to_thread(self.build_body, data_rows)
+        await self.http_cli.req(
+            self.ch_url, method="post", params=self.upload_params, headers=self.upload_headers, data=body
+        )
 
 
 @dataclasses.dataclass()
 class StatsUpdater(Generic[TStatsKey]):
+    """
+    In-memory stats counters, uploaded in batches by a background flusher
+    (see `manage_ctx`) every `min_sync_period_sec`,
+    or sooner when there are `max_pending_keys` distinct keys
+    (but not while the uploads are failing, to not retry those in a loop).
+
+    Above `max_stored_keys` distinct keys (e.g. while the uploads are failing),
+    the counts for the new keys are dropped (and logged at the next upload).
+    """
+
     ch_cli: CHClient
     min_sync_period_sec: float = 60.0
+    # The keys are aggregated, so the usual count is far lower;
+    # ClickHouse prefers fewer larger inserts, so this roughly matches its default block size.
+    max_pending_keys: int = 65536
+    # The memory bound.
+    max_stored_keys: int = 4 * 65536
     logger: logging.Logger = LOGGER
 
     def __post_init__(self) -> None:
         self.stats: dict[TStatsKey, int] = {}
+        self.dropped_count = 0
         self.last_sync_mts = time.monotonic()
-        self.upload_tasks: set[asyncio.Task] = set()
+        self.upload_failing = False
+        self.flush_requested = asyncio.Event()
+        self.stopping = False
 
     def increment_stats_straight(self, key: TStatsKey, count: int = 1) -> None:
-        self.stats[key] = self.stats.setdefault(key, 0) + count
-
-    @property
-    def is_upload_pending(self) -> bool:
-        return time.monotonic() > self.last_sync_mts + self.min_sync_period_sec
+        stats = self.stats
+        prev_count = stats.get(key)
+        if prev_count is not None:
+            stats[key] = prev_count + count
+        elif len(stats) < self.max_stored_keys:
+            stats[key] = count
+        else:
+            self.dropped_count += count
 
     async def upload_stats_straight(self, data: dict[TStatsKey, int]) -> None:
         ts = datetime.datetime.now(datetime.UTC).replace(tzinfo=None).isoformat()
-        data_rows = [(*key, ts, count) for key, count in data.items()]
+        # Tuple concatenation, rather than a `(*key, ...)` unpacking of the (NamedTuple) key.
+        data_rows = [key + (ts, count) for key, count in data.items()]  # noqa: RUF005
         await self.ch_cli.upload(data_rows)
 
     async def upload_stats(self) -> None:
         upload_data = self.stats
         self.stats = {}
         self.last_sync_mts = time.monotonic()
+        if self.dropped_count:
+            self.logger.warning("Dropped stats over the size limit", extra=dict(x_dropped_count=self.dropped_count))
+            self.dropped_count = 0
+        if not upload_data:
+            return
         try:
             await self.upload_stats_straight(upload_data)
         except Exception:
             LOGGER.exception("Error uploading stats")
-            # Put the stats back in
-            for key, count in upload_data.items():
+            # Put the stats back in, merging the (usually fewer) new stats into the failed ones.
+            new_stats = self.stats
+            self.stats = upload_data
+            for key, count in new_stats.items():
                 self.increment_stats_straight(key, count)
+            # Retry on the next period, rather than on the next size trigger.
+            self.upload_failing = True
+            self.flush_requested.clear()
+        else:
+            self.upload_failing = False
 
-    async def increment_stats(self, key: TStatsKey, count: int = 1) -> None:
+    def increment_stats(self, key: TStatsKey, count: int = 1) -> None:
         self.increment_stats_straight(key, count)
-        if self.is_upload_pending:
-            # Upload in background
-            task = asyncio.create_task(self.upload_stats())
-            self.upload_tasks.add(task)
-            task.add_done_callback(self.upload_tasks.discard)
-            self.logger.debug(
-                "Running stats upload task, total tasks: %d, stats size: %r", len(self.upload_tasks), len(self.stats)
-            )
+        if len(self.stats) >= self.max_pending_keys and not self.upload_failing:
+            self.flush_requested.set()
+
+    async def run_flusher(self) -> None:
+        while not self.stopping:
+            timeout = self.last_sync_mts + self.min_sync_period_sec - time.monotonic()
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self.flush_requested.wait(), timeout=max(timeout, 0.0))
+            self.flush_requested.clear()
+            if self.stopping:
+                break
+            self.logger.debug("Uploading stats, stats size: %r", len(self.stats))
+            await self.upload_stats()
+
+        # The remaining stats, including the ones counted during an upload that was in progress on stop.
+        self.logger.debug("Uploading the final stats, stats size: %r", len(self.stats))
+        await self.upload_stats()
+
+    @contextlib.asynccontextmanager
+    async def manage_ctx(self) -> AsyncGenerator[Self, None]:
+        """Run the background flusher, and upload the remaining stats on exit"""
+        flusher_task = asyncio.create_task(self.run_flusher())
+        try:
+            yield self
+        finally:
+            self.stopping = True
+            self.flush_requested.set()
+            await flusher_task
@@ -4,8 +4,8 @@ import logging
 import time
 
 from .common import SIMPLE_CHAIN_INFOS, make_evmrpc_cli
-from .evmrpc.evmrpc_check import evmrpc_check
-from .settings import Settings
+from .evmrpc.evmrpc_check import EVMRPCCheckResult, evmrpc_check
+from .settings import Settings, get_settings
 
 LOGGER = logging.getLogger(__name__)
 
@@ -13,7 +13,7 @@ LOGGER = logging.getLogger(__name__)
 @dataclasses.dataclass()
 class Tasks:
     run_pause_sec: float = 60.0
-    settings: Settings = dataclasses.field(default_factory=Settings)
+    settings: Settings = dataclasses.field(default_factory=get_settings)
     logger: logging.Logger = LOGGER
 
     async def run_once(self) -> None:
@@ -28,20 +28,30 @@ class Tasks:
                 per_chain_pause_sec=0.5,
             )
         time_taken_sec = time.monotonic() - start_time
-        successes = [item for item in results if item["success"]]
-        failures = [item for item in results if not item["success"]]
-        chains = {item["chain"] for item in results}
-        any_success_chains = {item["chain"] for item in successes}
-        full_failure_chains = chains - any_success_chains
-        any_failure_chains = {item["chain"] for item in failures}
-        any_failure_nodes = {item["node"] for item in failures}
+        successes: list[EVMRPCCheckResult] = []
+        failures: list[EVMRPCCheckResult] = []
+        chains: set[str] = set()
+        any_success_chains: set[str] = set()
+        any_failure_chains: set[str] = set()
+        any_failure_nodes: set[str] = set()
+        for item in results:
+            chain = item["chain"]
+            chains.add(chain)
+            if item["success"]:
+                successes.append(item)
+                any_success_chains.add(chain)
+            else:
+                failures.append(item)
+                any_failure_chains.add(chain)
+                any_failure_nodes.add(item["node"])
+        full_failure_chains = sorted(chains - any_success_chains)
         extra_details = dict(
             x_successes=len(successes),
             x_failures=len(failures),
             x_chains=len(chains),
             x_failing_chains=sorted(any_failure_chains) or None,
             x_failing_nodes=sorted(any_failure_nodes) or None,
-            x_full_failure_chains=sorted(full_failure_chains) or None,
+            x_full_failure_chains=full_failure_chains or None,
             x_time_taken=time_taken_sec,
         )
         if failures:
@@ -55,7 +65,7 @@ class Tasks:
             )
         if full_failure_chains:
             self.logger.error(
-                "EVMRPC check has fully failing chains: %s", ", ".join(sorted(full_failure_chains)), extra=extra_details
+                "EVMRPC check has fully failing chains: %s", ", ".join(full_failure_chains), extra=extra_details
             )
         self.logger.info(
             "EVMRPC check results",
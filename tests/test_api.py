@@ -0,0 +1,55 @@
+import logging
+
+import fastapi
+import pytest
+from fastapi.testclient import TestClient
+from hyapp.api import TraceIdMiddleware
+
+from evmrpcproxy.api_common import TimingMiddleware
+from evmrpcproxy.api_handlers import _get_chain_config, handle_http_error
+
+
+def test_uncaught_error_response() -> None:
+    app = fastapi.FastAPI()
+
+    @app.get("/raise")
+    async def raise_error() -> None:
+        raise ValueError("test error")
+
+    app.add_middleware(TimingMiddleware)
+    app.add_middleware(TraceIdMiddleware, trace_id_prefix="70")
+    # Would re-raise if the error got to the `ServerErrorMiddleware`.
+    with TestClient(app) as cli:
+        resp = cli.get("/raise")
+    assert resp.status_code == 500
+    data = resp.json()
+    assert data["status"] == "Internal Error"
+    assert data["trace_id"].startswith("70")
+
+
+def test_http_error_logging(caplog: pytest.LogCaptureFixture) -> None:
+    app = fastapi.FastAPI()
+
+    @app.get("/forbidden")
+    async def forbidden() -> None:
+        raise fastapi.HTTPException(status_code=403, detail="test forbidden")
+
+    app.add_exception_handler(fastapi.HTTPException, handle_http_error)
+    app.add_middleware(TimingMiddleware)
+    with caplog.at_level(logging.WARNING), TestClient(app) as cli:
+        resp = cli.get("/forbidden")
+    assert resp.status_code == 403
+    [record] = [record for record in caplog.records if record.name == "evmrpcproxy.api_handlers"]
+    assert record.levelno == logging.WARNING
+    assert record.exc_info is None
+    assert isinstance(getattr(record, "x_timing", None), float)
+
+
+@pytest.mark.parametrize("chain", [137, "137", "0137", "polygon", "Polygon"])
+def test_get_chain_config(chain: int | str) -> None:
+    assert _get_chain_config(chain)["id"] == 137
+
+
+def test_get_chain_config_not_found() -> None:
+    with pytest.raises(fastapi.HTTPException):
+        _get_chain_config("nochain")
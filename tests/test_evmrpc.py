@@ -1,8 +1,11 @@
+import asyncio
 import dataclasses
+import time
 from collections.abc import Awaitable, Callable
 from typing import Any, NamedTuple, cast
 
 import aiohttp
+import orjson
 import pytest
 import yaml
 from hyapp.https import HTTPClient, HTTPResponse
@@ -10,6 +13,7 @@ from hyapp.jsons import json_dumps
 
 from evmrpcproxy.common import make_evmrpc_cli
 from evmrpcproxy.evmrpc.evmrpc_client import EVMRPCClient, EVMRPCErrorException
+from evmrpcproxy.evmrpc.evmrpc_config import get_evmrpc_config, get_evmrpc_config_public
 from evmrpcproxy.evmrpc.evmrpc_config_model import (
     EVMRPCConfig,
     EVMRPCNodeConfig,
@@ -51,14 +55,28 @@ def test_evmrpc_config_settings() -> None:
     assert config.chains["mainnet"]["infura"].supports_batch
 
 
+def test_evmrpc_config_builtin() -> None:
+    # Also validates the url templates.
+    config = get_evmrpc_config()
+    assert config.chains["mainnet"]
+    assert get_evmrpc_config_public().chains["mainnet"]
+
+
 class MockAHResponse(NamedTuple):
     status: int
 
 
+def _req_body(req_args: dict[str, Any]) -> Any:
+    # `EVMRPCClient` sends pre-serialized data.
+    return orjson.loads(req_args["data"])
+
+
 @dataclasses.dataclass
 class MockHTTPClient:
     handler: Callable
     requests: list[dict[str, Any]] = dataclasses.field(default_factory=list)
+    # As in a non-entered `HTTPClient`.
+    session: aiohttp.ClientSession | None = None
 
     async def req(self, **kwargs: Any) -> HTTPResponse:
         self.requests.append(kwargs)
@@ -80,7 +98,7 @@ class MockHTTPClient:
 
     @property
     def req_bodies(self) -> list[Any]:
-        return [req.get("json") for req in self.requests]
+        return [_req_body(req) for req in self.requests]
 
     def clear(self) -> None:
         self.requests = []
@@ -148,6 +166,141 @@ async def test_evmrpc_rotation(sample_settings) -> None:
     assert "test raise 2" in repr(exc)
 
 
+def _handler_aerr(url: str, **_: Any):
+    if "a.example" in url:
+        raise aiohttp.ClientError("test raise a")
+    return {"mock": 3}
+
+
+async def test_evmrpc_rotation_backoff() -> None:
+    config = EVMRPCConfig.model_validate(
+        {
+            "mainnet": {"node_a": "https://a.example/", "node_b": "https://b.example/", "node_c": "https://c.example/"},
+        }
+    )
+    http_mock = MockHTTPClient(handler=_handler_err)
+    evmrpc_client = EVMRPCClient(
+        evmrpc_config=config, evmrpc_secrets=EVMRPCSecrets(), http_cli=cast("HTTPClient", http_mock)
+    )
+    chain_name = "mainnet"
+    req_data = {"test_req": 1}
+
+    # A failure on a pinned node doesn't rotate, but makes the node back off.
+    with pytest.raises(EVMRPCErrorException):
+        await evmrpc_client.request(chain_name, req_data, node_name="node_b")
+    assert evmrpc_client.get_node_config(chain_name).node_name == "node_a"
+
+    # Rotation skips the backed-off node.
+    http_mock.handler = _handler_aerr
+    resp = await evmrpc_client.request(chain_name, req_data)
+    assert resp.req.node_config.node_name == "node_c"
+    assert resp.req.try_n == 1
+
+
+async def test_evmrpc_node_stats() -> None:
+    config = EVMRPCConfig.model_validate({"mainnet": {"node_a": "https://a.example/"}})
+
+    def handler_revert(**_: Any) -> dict[str, Any]:
+        return {"jsonrpc": "2.0", "id": 1, "error": {"code": 3, "message": "execution reverted"}}
+
+    http_mock = MockHTTPClient(handler=handler_revert)
+    evmrpc_client = EVMRPCClient(
+        evmrpc_config=config, evmrpc_secrets=EVMRPCSecrets(), http_cli=cast("HTTPClient", http_mock)
+    )
+    chain_name = "mainnet"
+    [node_a] = evmrpc_client.get_all_node_configs(chain_name)
+    stats = evmrpc_client.node_stats[chain_name, "node_a"]
+    evmrpc_client._record_node_error(node_a)
+
+    # Error responses are returned, but don't count as a success.
+    resp = await evmrpc_client.request(chain_name, {"test_req": 1})
+    assert resp.has_errors
+    assert stats.is_backed_off(time.monotonic())
+    assert stats.latency_ewma is None
+
+    http_mock.handler = _handler_ok
+    await evmrpc_client.request(chain_name, {"test_req": 1})
+    assert not stats.is_backed_off(time.monotonic())
+    assert stats.latency_ewma is not None
+
+
+async def test_evmrpc_rotation_slow_node_retried() -> None:
+    config = EVMRPCConfig.model_validate(
+        {
+            "mainnet": {"node_a": "https://a.example/", "node_b": "https://b.example/", "node_c": "https://c.example/"},
+        }
+    )
+    evmrpc_client = EVMRPCClient(
+        evmrpc_config=config,
+        evmrpc_secrets=EVMRPCSecrets(),
+        http_cli=cast("HTTPClient", MockHTTPClient(handler=_handler_ok)),
+    )
+    chain_name = "mainnet"
+    node_a, node_b, node_c = evmrpc_client.get_all_node_configs(chain_name)
+    evmrpc_client._record_node_latency(node_a, 0.1)
+    evmrpc_client._record_node_latency(node_b, 1.0)
+    evmrpc_client._record_node_latency(node_c, 0.1)
+
+    # The slow node is skipped.
+    assert evmrpc_client.get_node_config(chain_name, rotate=True).node_name == "node_c"
+    assert evmrpc_client.get_node_config(chain_name, rotate=True).node_name == "node_a"
+
+    # Until its latency is too old to go by.
+    evmrpc_client.node_stats[chain_name, "node_b"].latency_mts -= evmrpc_client.node_latency_max_age_sec + 1
+    assert evmrpc_client.get_node_config(chain_name, rotate=True).node_name == "node_b"
+    # And then it's measured anew.
+    evmrpc_client._record_node_latency(node_b, 0.1)
+    assert evmrpc_client.node_stats[chain_name, "node_b"].latency_ewma == 0.1
+
+
+async def test_evmrpc_non_json_response(sample_settings) -> None:
+    def handler(**_: Any) -> HTTPResponse:
+        return HTTPResponse(
+            orig=cast("aiohttp.ClientResponse", MockAHResponse(status=502)),
+            content=b"<html>" + b"x" * 100_000,
+            time_taken_sec=0.0,
+        )
+
+    http_mock = MockHTTPClient(handler=handler)
+    evmrpc_client = make_evmrpc_cli(settings=sample_settings, http_cli=cast("HTTPClient", http_mock))
+    evmrpc_client.max_resp_log_size = 100
+    with pytest.raises(EVMRPCErrorException) as exc:
+        await evmrpc_client.request("mainnet", {"test_req": 1}, node_name="quiknode")
+    assert exc.value.last_status == 502
+    assert exc.value.last_response is not None
+    assert exc.value.last_response.data == {"__raw__": "<html>" + "x" * 94 + "…"}
+
+
+async def test_evmrpc_unbatch_concurrency() -> None:
+    config = EVMRPCConfig.model_validate(
+        {"bouncebit": {"node_a": {"url": "https://a.example/", "supports_batch": False, "unbatch_max_concurrency": 2}}}
+    )
+
+    @dataclasses.dataclass
+    class SlowMockHTTPClient(MockHTTPClient):
+        in_flight: int = 0
+        max_in_flight: int = 0
+
+        async def req(self, **kwargs: Any) -> HTTPResponse:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                await asyncio.sleep(0.001)
+                return await super().req(**kwargs)
+            finally:
+                self.in_flight -= 1
+
+    http_mock = SlowMockHTTPClient(handler=lambda **req_args: _pong_req_to_resp(_req_body(req_args)))
+    evmrpc_client = EVMRPCClient(
+        evmrpc_config=config, evmrpc_secrets=EVMRPCSecrets(), http_cli=cast("HTTPClient", http_mock)
+    )
+    req_data = [{"jsonrpc": "2.0", "id": idx, "method": "eth_blockNumber"} for idx in range(10)]
+    resp = await evmrpc_client.request("bouncebit", req_data)
+    assert [item["id"] for item in resp.data] == list(range(10))
+    assert len(http_mock.requests) == 10
+    assert http_mock.max_in_flight == 2
+
+
 def _pong_req_to_resp(item: dict[str, Any]) -> dict:
     assert isinstance(item, dict), item
     return {
@@ -160,7 +313,7 @@ def _pong_req_to_resp(item: dict[str, Any]) -> dict:
 @pytest.fixture
 def pong_evmrpc_cli_and_mock(sample_settings) -> tuple[EVMRPCClient, MockHTTPClient]:
     def handler(**req_args: Any):
-        req_data = req_args.get("json")
+        req_data = _req_body(req_args)
         if isinstance(req_data, list):
             return [_pong_req_to_resp(item) for item in req_data]
         assert isinstance(req_data, dict), req_data
@@ -0,0 +1,260 @@
+import asyncio
+import dataclasses
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any, cast
+
+import pytest
+from hyapp.https import HTTPClient
+from hyapp.jsons import json_dumps
+
+from evmrpcproxy.evmrpc.evmrpc_config_model import EVMRPCNodeConfig
+from evmrpcproxy.evmrpc.evmrpc_gas import GasError, W3GasHelper
+from evmrpcproxy.evmrpc.evmrpc_middleware import EVMRPCExtGasMiddleware, _GasBatcher
+from evmrpcproxy.evmrpc.evmrpc_models import (
+    DEFAULT_REQUEST_PARAMS,
+    EVMRPCErrorResponseException,
+    EVMRPCRequest,
+    EVMRPCRequestBatch,
+    EVMRPCResponse,
+)
+
+
+async def test_gas_params_concurrent() -> None:
+    estimate_started = asyncio.Event()
+    reqs_seen: list[list[dict[str, Any]]] = []
+
+    async def req_node(reqs: list[dict[str, Any]]) -> list[Any]:
+        reqs_seen.append(reqs)
+        methods = [req["method"] for req in reqs]
+        if methods == ["eth_gasPrice"]:
+            # Would time out if the requests were sequential.
+            await asyncio.wait_for(estimate_started.wait(), timeout=1.0)
+            return ["0x64"]
+        assert methods == ["eth_estimateGas"], methods
+        estimate_started.set()
+        return ["0x5208"]
+
+    # merlin: legacy gas price.
+    helper = W3GasHelper(chain_id=4200, req_node=req_node)
+    result = await helper.build_gas_params({"from": "0x29097A7dc18F1d7B736Ead6328370913AB8d845c"})
+    # +20% gas price, +100% gas units.
+    assert result == {"gasPrice": hex(120), "gas": hex(21000 * 2)}
+    [estimate_req] = [reqs for reqs in reqs_seen if reqs[0]["method"] == "eth_estimateGas"]
+    assert "gasPrice" not in estimate_req[0]["params"][0]
+
+
+@dataclasses.dataclass
+class MockGasstationResponse:
+    data: dict[str, Any]
+
+    @property
+    def content(self) -> bytes:
+        return json_dumps(self.data)
+
+    def json_untyped(self) -> Any:
+        return self.data
+
+
+@dataclasses.dataclass
+class MockGasstationHTTPClient:
+    urls: list[str] = dataclasses.field(default_factory=list)
+
+    async def req(self, url: str) -> MockGasstationResponse:
+        self.urls.append(url)
+        await asyncio.sleep(0.01)
+        return MockGasstationResponse({"fast": 123})
+
+
+async def test_gasstation_single_flight() -> None:
+    http_mock = MockGasstationHTTPClient()
+
+    async def req_node(reqs: list[dict[str, Any]]) -> list[Any]:
+        raise AssertionError("Unexpected node request")
+
+    helpers = [W3GasHelper(chain_id=1101, req_node=req_node, http_cli=cast("HTTPClient", http_mock)) for _ in range(3)]
+    url = "https://gasstation.example/test_gasstation_single_flight"
+    results = await asyncio.gather(*(helper._request_gasstation(url) for helper in helpers))
+    assert results == [123, 123, 123]
+    assert http_mock.urls == [url]
+
+    # Cached afterwards.
+    assert await helpers[0]._request_gasstation(url) == 123
+    assert http_mock.urls == [url]
+
+
+def _make_top_req(**kwargs: Any) -> EVMRPCRequest:
+    node_config = EVMRPCNodeConfig(
+        chain_name="mainnet", node_name="node_a", url="https://a.example/", **{"coalesce_gas_requests": True, **kwargs}
+    )
+    return EVMRPCRequestBatch(data=[], node_config=node_config, req_params=DEFAULT_REQUEST_PARAMS, try_n=0)
+
+
+@dataclasses.dataclass
+class MockGasBatchSend:
+    sent: list[list[str]] = dataclasses.field(default_factory=list)
+
+    async def __call__(self, items: list[str], top_req: EVMRPCRequest) -> list[str]:
+        self.sent.append(items)
+        await asyncio.sleep(0.01)
+        return [f"res_{item}" for item in items]
+
+
+async def _batcher_request_all(batcher: _GasBatcher, send: MockGasBatchSend, count: int, **kwargs: Any) -> None:
+    results = await asyncio.gather(
+        *(
+            batcher.request([f"a{idx}", f"b{idx}"], top_req=_make_top_req(**kwargs), caller=object(), send=send)
+            for idx in range(count)
+        )
+    )
+    assert results == [[f"res_a{idx}", f"res_b{idx}"] for idx in range(count)]
+
+
+async def test_gas_batcher_coalesce() -> None:
+    send = MockGasBatchSend()
+    batcher = _GasBatcher()
+    await _batcher_request_all(batcher, send, 4)
+    # The first one is sent right away, and the rest are coalesced while it is in flight.
+    assert send.sent == [["a0", "b0"], ["a1", "b1", "a2", "b2", "a3", "b3"]]
+    assert not batcher._in_flight
+    assert not batcher._in_flight_own
+
+
+async def test_gas_batcher_max_items() -> None:
+    send = MockGasBatchSend()
+    await _batcher_request_all(_GasBatcher(max_items=5), send, 5)
+    assert send.sent == [["a0", "b0"], ["a1", "b1", "a2", "b2"], ["a3", "b3", "a4", "b4"]]
+
+
+async def test_gas_batcher_disabled() -> None:
+    for kwargs in [{"coalesce_gas_requests": False}, {"supports_batch": False}]:
+        send = MockGasBatchSend()
+        await _batcher_request_all(_GasBatcher(), send, 3, **kwargs)
+        assert send.sent == [["a0", "b0"], ["a1", "b1"], ["a2", "b2"]]
+
+
+async def test_gas_batcher_aclose() -> None:
+    send = MockGasBatchSend()
+    batcher = _GasBatcher(max_wait_sec=10.0)
+    requests = asyncio.gather(
+        *(batcher.request([f"a{idx}"], top_req=_make_top_req(), caller=object(), send=send) for idx in range(3))
+    )
+    await asyncio.sleep(0.001)
+    # Flushes the pending batch rather than waiting for `max_wait_sec`.
+    await asyncio.wait_for(batcher.aclose(), timeout=1.0)
+    assert send.sent == [["a0"], ["a1", "a2"]]
+    assert not batcher._tasks
+    assert await requests == [["res_a0"], ["res_a1"], ["res_a2"]]
+
+
+async def test_gas_batcher_same_caller() -> None:
+    send = MockGasBatchSend()
+    top_req = _make_top_req()
+    caller = object()
+    # Would time out if the second request was held for a shared batch.
+    batcher = _GasBatcher(max_wait_sec=10.0)
+    results = await asyncio.wait_for(
+        asyncio.gather(
+            batcher.request(["a"], top_req=top_req, caller=caller, send=send),
+            batcher.request(["b"], top_req=top_req, caller=caller, send=send),
+        ),
+        timeout=1.0,
+    )
+    assert results == [["res_a"], ["res_b"]]
+    assert send.sent == [["a"], ["b"]]
+
+
+def _make_gas_middleware(next_handler: Callable[[EVMRPCRequest], Awaitable[EVMRPCResponse]]) -> EVMRPCExtGasMiddleware:
+    return EVMRPCExtGasMiddleware(
+        next_handler=next_handler,
+        straight_handler=next_handler,
+        all_nodes=[],
+        http_cli=HTTPClient(),
+        logger=logging.getLogger(__name__),
+    )
+
+
+def _item_result(item: dict[str, Any]) -> dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": item["id"], "result": f"res_{item['params'][0]}"}
+
+
+async def test_gas_batch_reordered_response() -> None:
+    sent: list[list[dict[str, Any]]] = []
+
+    async def next_handler(req: EVMRPCRequest) -> EVMRPCResponse:
+        assert isinstance(req.data, list)
+        sent.append(req.data)
+        await asyncio.sleep(0.01)
+        return EVMRPCResponse(data=[_item_result(item) for item in reversed(req.data)], req=req)
+
+    middleware = _make_gas_middleware(next_handler)
+    results = await asyncio.gather(
+        *(
+            middleware._req_node(
+                [{"method": "m", "params": [f"a{idx}"]}, {"method": "m", "params": [f"b{idx}"]}],
+                top_req=_make_top_req(),
+                caller=object(),
+            )
+            for idx in range(3)
+        )
+    )
+    assert results == [[f"res_a{idx}", f"res_b{idx}"] for idx in range(3)]
+    assert [len(reqs) for reqs in sent] == [2, 4]
+
+
+async def test_gas_batch_bad_response_ids() -> None:
+    async def next_handler(req: EVMRPCRequest) -> EVMRPCResponse:
+        assert isinstance(req.data, list)
+        return EVMRPCResponse(data=[{**_item_result(item), "id": 1} for item in req.data], req=req)
+
+    middleware = _make_gas_middleware(next_handler)
+    with pytest.raises(GasError):
+        await middleware._req_node(
+            [{"method": "m", "params": ["a"]}, {"method": "m", "params": ["b"]}],
+            top_req=_make_top_req(),
+            caller=object(),
+        )
+
+
+async def test_gas_batch_error_isolation() -> None:
+    async def next_handler(req: EVMRPCRequest) -> EVMRPCResponse:
+        assert isinstance(req.data, list)
+        await asyncio.sleep(0.01)
+        resp_data = [
+            {"jsonrpc": "2.0", "id": item["id"], "error": {"code": -32000, "message": "failed"}}
+            if item["params"][0] == "bad"
+            else _item_result(item)
+            for item in req.data
+        ]
+        resp = EVMRPCResponse(data=resp_data, req=req)
+        if any("error" in item for item in resp_data):
+            raise EVMRPCErrorResponseException(req=req, last_response=resp)
+        return resp
+
+    middleware = _make_gas_middleware(next_handler)
+    params = ["a", "b", "bad", "c"]
+    results = await asyncio.gather(
+        *(
+            middleware._req_node([{"method": "m", "params": [param]}], top_req=_make_top_req(), caller=object())
+            for param in params
+        ),
+        return_exceptions=True,
+    )
+    assert results[:2] == [["res_a"], ["res_b"]]
+    assert isinstance(results[2], EVMRPCErrorResponseException)
+    assert results[2].last_response.data == [
+        {"jsonrpc": "2.0", "id": 2, "error": {"code": -32000, "message": "failed"}}
+    ]
+    assert results[3] == ["res_c"]
+
+
+async def test_gasstation_http_cli_session() -> None:
+    async def next_handler(req: EVMRPCRequest) -> EVMRPCResponse:
+        raise AssertionError("Unexpected node request")
+
+    middleware = _make_gas_middleware(next_handler)
+    # The session of the EVMRPC client entered after the middleware was built.
+    async with middleware.http_cli:
+        assert middleware.http_cli.session is not None
+        assert middleware._make_gasstation_http_cli().session is middleware.http_cli.session
+    assert middleware._make_gasstation_http_cli().session is None
@@ -0,0 +1,161 @@
+import asyncio
+import dataclasses
+import gzip
+from typing import TYPE_CHECKING, Any, cast
+
+from evmrpcproxy.stats import (
+    REQUEST_STATS_COLUMNS,
+    CHClient,
+    RequestStatsKey,
+    StatsUpdater,
+)
+
+if TYPE_CHECKING:
+    from hyapp.https import HTTPClient
+
+
+@dataclasses.dataclass
+class MockCHClient:
+    uploads: list[list[tuple[Any, ...]]] = dataclasses.field(default_factory=list)
+    uploaded: asyncio.Event = dataclasses.field(default_factory=asyncio.Event)
+    error: Exception | None = None
+    # If specified, the uploads wait for it.
+    release: asyncio.Event | None = None
+
+    async def upload(self, data_rows: list[tuple[Any, ...]]) -> None:
+        self.uploads.append(data_rows)
+        self.uploaded.set()
+        if self.release is not None:
+            await self.release.wait()
+        if self.error is not None:
+            raise self.error
+
+
+def _make_key(**kwargs: Any) -> RequestStatsKey:
+    values: dict[str, Any] = dict(
+        env="tests",
+        final=True,
+        chain="mainnet",
+        requester="test",
+        success=True,
+        x_requester="-",
+        method="eth_blockNumber",
+        node="quiknode",
+        try_n=0,
+    )
+    return RequestStatsKey(**{**values, **kwargs})
+
+
+def test_serialize_ndjson() -> None:
+    rows = [("a],[b", 1), ("c", 2)]
+    assert CHClient.serialize_ndjson(rows) == b'["a],[b",1]\n["c",2]\n'
+    assert CHClient.serialize_ndjson([]) == b""
+
+
+@dataclasses.dataclass
+class MockCHHTTPClient:
+    requests: list[dict[str, Any]] = dataclasses.field(default_factory=list)
+
+    async def req(self, url: str, **kwargs: Any) -> None:
+        self.requests.append({"url": url, **kwargs})
+
+
+async def test_ch_upload_gzip() -> None:
+    http_mock = MockCHHTTPClient()
+    ch_cli = CHClient(
+        ch_table_name="erp_request_stats",
+        ch_table_column_names=REQUEST_STATS_COLUMNS,
+        ch_url="https://ch.example/",
+        http_cli=cast("HTTPClient", http_mock),
+    )
+    rows = [(*_make_key(), "2020-01-01T00:00:00", 1)]
+    await ch_cli.upload(rows)
+    [req] = http_mock.requests
+    assert req["headers"] == {"Content-Encoding": "gzip"}
+    assert gzip.decompress(req["data"]) == CHClient.serialize_ndjson(rows)
+
+
+async def test_stats_flush_on_exit() -> None:
+    ch_mock = MockCHClient()
+    stats = StatsUpdater[RequestStatsKey](ch_cli=cast("CHClient", ch_mock))
+    async with stats.manage_ctx():
+        stats.increment_stats(_make_key())
+        stats.increment_stats(_make_key())
+        stats.increment_stats(_make_key(success=False))
+        assert ch_mock.uploads == []
+
+    [rows] = ch_mock.uploads
+    # key fields, ts, count
+    assert [(row[:-2], row[-1]) for row in rows] == [
+        (tuple(_make_key()), 2),
+        (tuple(_make_key(success=False)), 1),
+    ]
+    assert stats.stats == {}
+
+
+async def test_stats_flush_on_size() -> None:
+    ch_mock = MockCHClient()
+    stats = StatsUpdater[RequestStatsKey](ch_cli=cast("CHClient", ch_mock), max_pending_keys=2)
+    async with stats.manage_ctx():
+        stats.increment_stats(_make_key(try_n=0))
+        stats.increment_stats(_make_key(try_n=1))
+        await asyncio.wait_for(ch_mock.uploaded.wait(), timeout=1.0)
+        assert len(ch_mock.uploads) == 1
+
+    # Nothing left to upload on exit.
+    assert len(ch_mock.uploads) == 1
+
+
+async def test_stats_flush_on_exit_during_upload() -> None:
+    release = asyncio.Event()
+    ch_mock = MockCHClient(release=release)
+    stats = StatsUpdater[RequestStatsKey](ch_cli=cast("CHClient", ch_mock))
+    async with stats.manage_ctx():
+        stats.increment_stats(_make_key(try_n=0))
+        stats.flush_requested.set()
+        await asyncio.wait_for(ch_mock.uploaded.wait(), timeout=1.0)
+        # Counted while the upload is in progress, which is still in progress on exit.
+        stats.increment_stats(_make_key(try_n=1))
+        asyncio.get_running_loop().call_later(0.01, release.set)
+
+    assert len(ch_mock.uploads) == 2
+    assert len(ch_mock.uploads[1]) == 1
+    assert not stats.stats
+
+
+async def test_stats_upload_error() -> None:
+    stats = StatsUpdater[RequestStatsKey](ch_cli=cast("CHClient", MockCHClient()))
+    stats.increment_stats(_make_key(try_n=0))
+    stats.increment_stats(_make_key(try_n=1))
+
+    async def upload_stats_straight(data: dict[RequestStatsKey, int]) -> None:
+        # Counted while the upload is in progress.
+        stats.increment_stats(_make_key(try_n=1))
+        stats.increment_stats(_make_key(try_n=2))
+        raise ValueError("test upload error")
+
+    stats.upload_stats_straight = upload_stats_straight  # type: ignore[method-assign]
+    await stats.upload_stats()
+    assert stats.stats == {_make_key(try_n=0): 1, _make_key(try_n=1): 2, _make_key(try_n=2): 1}
+
+
+async def test_stats_upload_error_backoff() -> None:
+    ch_mock = MockCHClient(error=ValueError("test upload error"))
+    stats = StatsUpdater[RequestStatsKey](ch_cli=cast("CHClient", ch_mock), max_pending_keys=2, max_stored_keys=3)
+    async with stats.manage_ctx():
+        stats.increment_stats(_make_key(try_n=0))
+        stats.increment_stats(_make_key(try_n=1))
+        await asyncio.wait_for(ch_mock.uploaded.wait(), timeout=1.0)
+        await asyncio.sleep(0.01)
+        assert len(ch_mock.uploads) == 1
+
+        # No re-triggered uploads while failing, and the size is capped.
+        for try_n in range(10):
+            stats.increment_stats(_make_key(try_n=try_n))
+            await asyncio.sleep(0.001)
+        assert len(ch_mock.uploads) == 1
+        assert stats.stats == {_make_key(try_n=0): 2, _make_key(try_n=1): 2, _make_key(try_n=2): 1}
+        assert stats.dropped_count == 7
+
+    # Retried on exit.
+    assert len(ch_mock.uploads) == 2